@@ -0,0 +1,289 @@
+"""Benchmark the chat and automode loop against a local mock Messages API.
+
+Usage:
+    python benchmarks/bench_agent.py [--iterations 50] [--tools 3] [--latency 0.02]
+                                     [--no-stream] [--json out.json] [--compare baseline.json]
+
+Each automode iteration is one tool round: the mock replies with several
+tool_use blocks (read_file, list_files, write_to_file on a scratch
+project), the tools run for real, and the mock then closes the turn. No
+network access or API key is needed.
+
+Reports turns per second, per-phase latency (request build, network,
+tool execution, rendering) and memory growth across the run. Memory is
+sampled as resident set size; --trace-memory tracks Python allocations
+with tracemalloc instead, which is more precise but slows every phase
+down. With --compare, the key numbers are printed next to a previous
+--json result.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import claude_engineer  # noqa: E402
+from claude_engineer.session import Session  # noqa: E402
+from mock_api import MockMessagesAPI, tool_round_script  # noqa: E402
+
+PHASES = ("request_build", "network", "tools", "rendering")
+# Metrics shown by --compare, with whether a higher value is better
+COMPARED_METRICS = (
+    ("turns_per_second", True),
+    ("requests_per_second", True),
+    ("phases.request_build.mean_ms", False),
+    ("phases.network.mean_ms", False),
+    ("phases.tools.mean_ms", False),
+    ("phases.rendering.mean_ms", False),
+    ("memory.growth_per_iteration_kb", False),
+)
+
+
+class TimedRenderer:
+    def __init__(self, renderer, timings):
+        self.renderer = renderer
+        self.timings = timings
+
+    def feed(self, text):
+        start = time.perf_counter()
+        self.renderer.feed(text)
+        self.timings["rendering_total"] += time.perf_counter() - start
+
+    def finish(self):
+        start = time.perf_counter()
+        self.renderer.finish()
+        self.timings["rendering_total"] += time.perf_counter() - start
+
+
+class TimedSession(Session):
+    """Session that records how long each phase of a turn takes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {phase: [] for phase in PHASES}
+        self.timings["rendering_total"] = 0.0
+        self._build_time = 0.0
+
+    def system_prompt(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().system_prompt(*args, **kwargs)
+        finally:
+            self._build_time += time.perf_counter() - start
+
+    def request_tools(self):
+        start = time.perf_counter()
+        try:
+            return super().request_tools()
+        finally:
+            self._build_time += time.perf_counter() - start
+
+    async def request_messages(self):
+        start = time.perf_counter()
+        try:
+            return await super().request_messages()
+        finally:
+            self._build_time += time.perf_counter() - start
+
+    def renderer(self):
+        return TimedRenderer(super().renderer(), self.timings)
+
+    async def create_message(self, content, **request):
+        self.timings["request_build"].append(self._build_time)
+        self._build_time = 0.0
+        rendered_before = self.timings["rendering_total"]
+        start = time.perf_counter()
+        try:
+            return await super().create_message(content, **request)
+        finally:
+            rendering = self.timings["rendering_total"] - rendered_before
+            self.timings["rendering"].append(rendering)
+            self.timings["network"].append(time.perf_counter() - start - rendering)
+
+    async def run_tools(self, tool_uses):
+        start = time.perf_counter()
+        try:
+            return await super().run_tools(tool_uses)
+        finally:
+            self.timings["tools"].append(time.perf_counter() - start)
+
+
+def make_project(directory, files=200, file_lines=400):
+    os.makedirs(os.path.join(directory, "src"), exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(directory, "src", f"module_{i}.py"), "w") as f:
+            for line in range(file_lines):
+                f.write(f"def function_{i}_{line}(value):\n    return value * {line}\n")
+
+
+def tool_uses(count):
+    available = [
+        {"name": "read_file", "input": {"path": "src/module_1.py", "start_line": 1, "end_line": 200}},
+        {"name": "list_files", "input": {"path": "src"}},
+        {"name": "write_to_file", "input": {"path": "notes.md", "content": "# Notes\n" + "- step\n" * 50}},
+        {"name": "read_file", "input": {"path": "src/module_2.py"}},
+    ]
+    return [available[i % len(available)] for i in range(count)]
+
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "total_ms": sum(samples) * 1000,
+    }
+
+
+def max_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return max_rss_kb()
+
+
+def memory_sample_kb(traced):
+    return tracemalloc.get_traced_memory()[0] / 1024 if traced else current_rss_kb()
+
+
+def run_benchmark(args, project_dir):
+    from anthropic import AsyncAnthropic
+
+    script = tool_round_script(tool_uses(args.tools), text="Let me look at the project. " * 8,
+                               final_text="I have updated the notes.\n```python\nprint('ok')\n```\n")
+    with MockMessagesAPI(script, latency=args.latency, chunk_delay=args.chunk_delay) as api:
+        client = AsyncAnthropic(api_key="mock", base_url=api.url, max_retries=0)
+        session = TimedSession(client=client, cwd=project_dir, stream=not args.no_stream)
+        memory = []
+        turn_times = []
+        if args.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            user_input = "Refactor the project."
+            for iteration in range(args.iterations):
+                turn_start = time.perf_counter()
+                session.automode = True
+                session.chat(user_input, current_iteration=iteration + 1, max_iterations=args.iterations)
+                turn_times.append(time.perf_counter() - turn_start)
+                user_input = "Continue with the next step."
+                memory.append(memory_sample_kb(args.trace_memory))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 1024 if args.trace_memory else max_rss_kb()
+        tracemalloc.stop()
+        requests = api.request_count
+
+    if session.last_error:
+        raise RuntimeError(f"Benchmark run failed: {session.last_error}")
+    # Skip the first iteration (imports, client warm-up) when measuring growth
+    baseline = memory[0] if memory else 0
+    growth = (memory[-1] - baseline) / max(1, len(memory) - 1) if memory else 0
+    return {
+        "iterations": args.iterations,
+        "requests": requests,
+        "elapsed_seconds": elapsed,
+        "turns_per_second": args.iterations / elapsed,
+        "requests_per_second": requests / elapsed,
+        "turn": summarize(turn_times),
+        "phases": {phase: summarize(session.timings[phase]) for phase in PHASES},
+        "history": {"messages": len(session.history), "tokens": session.history.total_tokens()},
+        "memory": {
+            "measure": "tracemalloc" if args.trace_memory else "rss",
+            "start_kb": baseline,
+            "end_kb": memory[-1] if memory else 0,
+            "peak_kb": peak,
+            "growth_per_iteration_kb": growth,
+            "samples_kb": [round(value, 1) for value in memory],
+        },
+    }
+
+
+def lookup(results, dotted):
+    value = results
+    for key in dotted.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def print_comparison(results, baseline):
+    print(f"\nCompared with {baseline.get('version', '?')} ({baseline.get('timestamp', '?')}):")
+    for metric, higher_is_better in COMPARED_METRICS:
+        new, old = lookup(results, metric), lookup(baseline, metric)
+        if new is None or old is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = change < 0 if higher_is_better else change > 0
+        flag = "  <- slower" if worse and abs(change) >= 10 else ""
+        print(f"  {metric:<34} {old:10.2f} -> {new:10.2f}  ({change:+.1f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50, help="Automode iterations to run (default: 50)")
+    parser.add_argument("--tools", type=int, default=3, help="tool_use blocks per reply (default: 3)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock time to first byte in seconds (default: 0.02)")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Mock delay between streamed events in seconds")
+    parser.add_argument("--no-stream", action="store_true", help="Use non-streaming requests")
+    parser.add_argument("--trace-memory", action="store_true", help="Measure Python allocations with tracemalloc instead of RSS")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Earlier --json result to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_project(tmp)
+        results = run_benchmark(args, tmp)
+
+    results = {
+        "version": claude_engineer.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {
+            "tools_per_reply": args.tools,
+            "latency": args.latency,
+            "chunk_delay": args.chunk_delay,
+            "stream": not args.no_stream,
+            "trace_memory": args.trace_memory,
+        },
+        **results,
+    }
+
+    print(f"{results['iterations']} iterations, {results['requests']} requests in {results['elapsed_seconds']:.2f}s")
+    print(f"{results['turns_per_second']:.1f} turns/s, {results['requests_per_second']:.1f} requests/s")
+    for phase in PHASES:
+        stats = results["phases"][phase]
+        if stats["count"]:
+            print(f"{phase:<14} mean {stats['mean_ms']:8.2f} ms  p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+    memory = results["memory"]
+    print(f"memory ({memory['measure']}) {memory['start_kb']:.0f} KB -> {memory['end_kb']:.0f} KB "
+          f"({memory['growth_per_iteration_kb']:+.1f} KB/iteration, peak {memory['peak_kb']:.0f} KB)")
+    print(f"history        {results['history']['messages']} messages, ~{results['history']['tokens']} tokens")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
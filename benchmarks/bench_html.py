@@ -0,0 +1,107 @@
+"""Compare HTML-to-text engines used by read_file.
+
+Usage:
+    python benchmarks/bench_html.py [corpus_dir] [--repeat N] [--json out.json]
+
+Without a corpus directory a synthetic corpus of saved-page style documents
+is generated in a temporary directory.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from claude_engineer import html_text  # noqa: E402
+from claude_engineer.cache import DiskCache  # noqa: E402
+
+WORDS = "engineer claude parser latency cache stream token render vendor manual report table".split()
+
+
+def generate_corpus(directory, count=20, paragraphs=2000):
+    rng = random.Random(0)
+    for i in range(count):
+        body = []
+        for p in range(paragraphs):
+            words = " ".join(rng.choice(WORDS) for _ in range(30))
+            body.append(f"<div class='row'><p id='p{p}'>{words} <a href='#x'>link</a></p><span>{p}</span></div>")
+        page = (
+            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Report</title>"
+            "<style>.row { color: red }</style><script>var x = 1;</script></head><body>"
+            + "".join(body) + "</body></html>"
+        )
+        with open(os.path.join(directory, f"page{i}.html"), "w", encoding="utf-8") as f:
+            f.write(page)
+
+
+def corpus_files(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith((".html", ".htm", ".xhtml"))
+    )
+
+
+def time_engine(engine, files, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in files:
+            with open(path, "rb") as f:
+                html_text.extract_text(f.read(), engine=engine)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_cached(files, repeat, cache_dir):
+    html_text._cache = DiskCache("html_text", cache_dir=cache_dir)
+    for path in files:
+        html_text.extract_file_text(path)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in files:
+            html_text.extract_file_text(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", nargs="?", help="Directory of .html files (default: generated corpus)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = os.path.join(tmp, "corpus")
+            os.makedirs(corpus)
+            generate_corpus(corpus)
+        files = corpus_files(corpus)
+        total_bytes = sum(os.path.getsize(path) for path in files)
+
+        results = {"files": len(files), "bytes": total_bytes, "engines": {}}
+        for engine in html_text.available_engines():
+            results["engines"][engine] = time_engine(engine, files, args.repeat)
+        results["cached"] = time_cached(files, args.repeat, os.path.join(tmp, "cache"))
+
+    baseline = results["engines"].get("html.parser")
+    print(f"{len(files)} files, {total_bytes / 1e6:.1f} MB")
+    for name, seconds in list(results["engines"].items()) + [("cached", results["cached"])]:
+        speedup = f"  {baseline / seconds:6.1f}x" if baseline and seconds else ""
+        print(f"{name:<12} {seconds * 1000:10.1f} ms{speedup}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Check that importing claude_engineer stays within an import-time budget.
+
+Usage:
+    python benchmarks/bench_startup.py [--budget-ms 100] [--runs 5] [--json out.json]
+
+Each module is imported in a fresh interpreter with ``-X importtime``; the
+best cumulative time over several runs is compared against the budget. The
+script also fails if any heavy dependency is imported eagerly. Exits with
+status 1 when a check fails so it can gate CI.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["claude_engineer", "claude_engineer.cli"]
+# Dependencies that must only load when the tool that needs them is first used
+HEAVY_MODULES = ["anthropic", "httpx", "PIL", "bs4", "lxml", "PyPDF2", "tavily", "pygments"]
+
+
+def import_times(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def eager_heavy_modules(module):
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    failed = False
+    results = {}
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(args.runs)]
+        best = min(run[module] for run in runs)
+        heavy = eager_heavy_modules(module)
+        own = {name: ms for name, ms in runs[0].items() if name.startswith("claude_engineer") and name != module}
+        slowest = sorted(own.items(), key=lambda item: item[1], reverse=True)[:5]
+        results[module] = {"import_ms": best, "eager_heavy_modules": heavy}
+
+        status = "ok" if best <= args.budget_ms and not heavy else "FAIL"
+        failed = failed or status == "FAIL"
+        print(f"{status:<4} {module:<24} {best:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if heavy:
+            print(f"     eagerly imports: {', '.join(heavy)}")
+        for name, ms in slowest:
+            print(f"     {ms:8.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"budget_ms": args.budget_ms, "modules": results}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Local stand-in for the Anthropic Messages API, for offline benchmarks.
+
+Serves POST /v1/messages, streamed (server-sent events) or not, from a
+script of replies. Each reply is a dict with optional "text", "tool_uses"
+(a list of {"name", "input"}) and "stop_reason". A reply with "status"
+(e.g. 429 or 529) is sent as an API error instead, with an optional
+"retry_after" header value. A script is either a list
+of replies, used in order and then repeated, or a callable that receives
+the request body and returns a reply.
+
+Usage as a standalone server:
+    python benchmarks/mock_api.py [--port 8765] [--latency 0.05] [--script replies.json]
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Characters of text sent per content_block_delta event
+TEXT_CHUNK_CHARS = 16
+
+
+def _estimate_tokens(body):
+    return max(1, len(json.dumps(body.get("messages", []))) // 4)
+
+
+def _has_tool_results(body):
+    messages = body.get("messages") or []
+    if not messages or messages[-1].get("role") != "user":
+        return False
+    content = messages[-1].get("content")
+    return isinstance(content, list) and any(block.get("type") == "tool_result" for block in content)
+
+
+def tool_round_script(tool_uses, text="Working on it.", final_text="Done with this step."):
+    """Reply with tool_uses to a new user message and with final_text once the tool results come back."""
+    def script(body):
+        if _has_tool_results(body):
+            return {"text": final_text}
+        return {"text": text, "tool_uses": tool_uses}
+    return script
+
+
+class MockMessagesAPI:
+    def __init__(self, script, latency=0.0, chunk_delay=0.0, host="127.0.0.1", port=0):
+        if callable(script):
+            self._next_reply = script
+        else:
+            replies = itertools.cycle(script)
+            self._next_reply = lambda body: next(replies)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.request_count = 0
+        self.last_request = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-messages-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def build_message(self, body):
+        with self._lock:
+            self.request_count += 1
+            self.last_request = body
+            reply = self._next_reply(body)
+            message_id = next(self._ids)
+        if "status" in reply:
+            return reply
+        content = []
+        if reply.get("text"):
+            content.append({"type": "text", "text": reply["text"]})
+        for i, tool_use in enumerate(reply.get("tool_uses") or []):
+            content.append({
+                "type": "tool_use",
+                "id": f"toolu_mock_{message_id}_{i}",
+                "name": tool_use["name"],
+                "input": tool_use.get("input", {})
+            })
+        stop_reason = reply.get("stop_reason") or ("tool_use" if reply.get("tool_uses") else "end_turn")
+        output_tokens = max(1, len(json.dumps(content)) // 4)
+        return {
+            "id": f"msg_mock_{message_id}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "mock"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": _estimate_tokens(body), "output_tokens": output_tokens}
+        }
+
+    def stream_events(self, message):
+        start = dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=1))
+        yield "message_start", {"type": "message_start", "message": start}
+        for index, block in enumerate(message["content"]):
+            if block["type"] == "text":
+                yield "content_block_start", {"type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""}}
+                for i in range(0, len(block["text"]), TEXT_CHUNK_CHARS):
+                    delta = {"type": "text_delta", "text": block["text"][i:i + TEXT_CHUNK_CHARS]}
+                    yield "content_block_delta", {"type": "content_block_delta", "index": index, "delta": delta}
+            else:
+                yield "content_block_start", {"type": "content_block_start", "index": index, "content_block": dict(block, input={})}
+                delta = {"type": "input_json_delta", "partial_json": json.dumps(block["input"])}
+                yield "content_block_delta", {"type": "content_block_delta", "index": index, "delta": delta}
+            yield "content_block_stop", {"type": "content_block_stop", "index": index}
+        yield "message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": message["usage"]["output_tokens"]}
+        }
+        yield "message_stop", {"type": "message_stop"}
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Streamed events are many small writes; without this they stall on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_error(self, reply):
+                error_type = {429: "rate_limit_error", 529: "overloaded_error"}.get(reply["status"], "api_error")
+                data = json.dumps({"type": "error", "error": {"type": error_type, "message": "Mock error"}}).encode("utf-8")
+                self.send_response(reply["status"])
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if reply.get("retry_after") is not None:
+                    self.send_header("retry-after", str(reply["retry_after"]))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.startswith("/v1/messages"):
+                    self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                    return
+                message = api.build_message(body)
+                if api.latency:
+                    time.sleep(api.latency)
+                if "status" in message:
+                    self._send_error(message)
+                    return
+                if not body.get("stream"):
+                    self._send_json(200, message)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event, data in api.stream_events(message):
+                    chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                    self.wfile.flush()
+                    if api.chunk_delay:
+                        time.sleep(api.chunk_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering each request")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed events")
+    parser.add_argument("--script", help="JSON file with a list of replies (default: one tool round per user message)")
+    args = parser.parse_args()
+
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    else:
+        script = tool_round_script([{"name": "list_files", "input": {"path": "."}}])
+    api = MockMessagesAPI(script, args.latency, args.chunk_delay, args.host, args.port)
+    print(f"Mock Messages API listening on {api.url} (set ANTHROPIC_BASE_URL to use it)")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,18 @@
-from .cli import main, chat_with_claude
-from .utils import (
-    print_colored, print_code, create_folder, create_file,
-    write_to_file, read_file, list_files, encode_image_to_base64,
-    tavily_search, USER_COLOR, CLAUDE_COLOR, TOOL_COLOR, RESULT_COLOR
-)
+import importlib
+import logging
 
 __version__ = "0.1.0"
 __all__ = [
     "main",
     "chat_with_claude",
+    "Session",
     "print_colored",
     "print_code",
     "create_folder",
     "create_file",
+    "write_files",
     "write_to_file",
+    "edit_file",
     "read_file",
     "list_files",
     "tavily_search",
@@ -24,8 +23,39 @@ __all__ = [
     "RESULT_COLOR"
 ]
 
-import logging
+# Public names are resolved on first access so importing the package stays cheap
+_LAZY_EXPORTS = {
+    "main": ".cli",
+    "chat_with_claude": ".cli",
+    "Session": ".session",
+    "print_colored": ".utils",
+    "print_code": ".utils",
+    "create_folder": ".utils",
+    "create_file": ".utils",
+    "write_files": ".utils",
+    "write_to_file": ".utils",
+    "edit_file": ".utils",
+    "read_file": ".utils",
+    "list_files": ".utils",
+    "tavily_search": ".utils",
+    "encode_image_to_base64": ".utils",
+    "USER_COLOR": ".utils",
+    "CLAUDE_COLOR": ".utils",
+    "TOOL_COLOR": ".utils",
+    "RESULT_COLOR": ".utils"
+}
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-logger.info("Claude Engineer package initialized")
\ No newline at end of file
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+import re
+import time
+from . import engine
+from .utils import print_colored, TOOL_COLOR, RESULT_COLOR, ERROR_COLOR
+from .session import Session, MODEL, MAX_TOKENS
+from .routing import resolve_model, ROUTING_POLICY
+from .telemetry import Telemetry
+
+
+def load_jobs(jobs_path):
+    jobs = []
+    with open(jobs_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            if "prompt" not in job:
+                raise ValueError(f"{jobs_path}:{line_number}: job has no 'prompt'")
+            job.setdefault("id", f"job-{line_number}")
+            jobs.append(job)
+    return jobs
+
+
+def _result_path(output_dir, job_id):
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(job_id))
+    return os.path.join(output_dir, f"{safe_id}.json")
+
+
+async def run_job(job, output_dir, prompt_cache=False, client=None, cassette=None, routing=ROUTING_POLICY, model=MODEL,
+                  telemetry=None):
+    session = Session(
+        model=resolve_model(job.get("model")) or model,
+        max_tokens=job.get("max_tokens", MAX_TOKENS),
+        cwd=job.get("cwd"),
+        client=client,
+        display=False,
+        prompt_cache=prompt_cache,
+        cassette=cassette,
+        routing=job.get("routing", routing),
+        telemetry=telemetry
+    )
+    result = {"id": job["id"], "status": "ok", "response": "", "error": None, "iterations": 0}
+    start = time.time()
+    try:
+        if job.get("cwd"):
+            os.makedirs(session.cwd, exist_ok=True)
+        iterations = int(job.get("automode", 0))
+        if iterations > 0:
+            result["response"], result["iterations"] = await session.arun_automode(job["prompt"], iterations)
+        else:
+            result["response"], _ = await session.achat(job["prompt"], image_path=job.get("image"))
+            result["iterations"] = 1
+        if session.last_error:
+            result["status"] = "error"
+            result["error"] = session.last_error
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["duration_seconds"] = round(time.time() - start, 3)
+    result["usage"] = session.usage
+
+    with open(_result_path(output_dir, job["id"]), "w", encoding="utf-8") as f:
+        json.dump(dict(result, messages=list(session.history)), f, indent=2, default=str)
+    return result
+
+
+async def arun_batch(jobs_path, output_dir="batch_results", concurrency=4, prompt_cache=False, client=None, cassette=None,
+                     routing=ROUTING_POLICY, model=MODEL, telemetry_json=None, telemetry_prom=None):
+    jobs = load_jobs(jobs_path)
+    # One set of metrics for the whole run, written out after every turn of every job and at the end
+    telemetry = Telemetry(telemetry_json, telemetry_prom)
+    os.makedirs(output_dir, exist_ok=True)
+    print_colored(f"Running {len(jobs)} jobs from {jobs_path} with concurrency {concurrency}", TOOL_COLOR)
+
+    # Every job is a task on the engine loop; the semaphore bounds how many talk to the API at once
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = []
+    start = time.time()
+
+    async def run(job):
+        async with semaphore:
+            try:
+                result = await run_job(job, output_dir, prompt_cache, client, cassette, routing, model, telemetry)
+            except Exception as e:
+                result = {"id": job["id"], "status": "error", "error": str(e)}
+        results.append(result)
+        if result["status"] == "ok":
+            print_colored(f"[{len(results)}/{len(jobs)}] {result['id']}: ok ({result['duration_seconds']}s)", RESULT_COLOR)
+        else:
+            print_colored(f"[{len(results)}/{len(jobs)}] {result['id']}: error: {result['error']}", ERROR_COLOR)
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+    with open(os.path.join(output_dir, "summary.jsonl"), "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, default=str) + "\n")
+
+    telemetry.flush()
+    failed = sum(1 for result in results if result["status"] != "ok")
+    print_colored(f"Finished {len(jobs)} jobs in {time.time() - start:.1f}s: {len(jobs) - failed} ok, {failed} failed. Results are in {output_dir}", TOOL_COLOR)
+    return results
+
+
+def run_batch(jobs_path, output_dir="batch_results", concurrency=4, prompt_cache=False, client=None, cassette=None,
+              routing=ROUTING_POLICY, model=MODEL, telemetry_json=None, telemetry_prom=None):
+    return engine.run(arun_batch(jobs_path, output_dir, concurrency, prompt_cache, client, cassette, routing, model,
+                                 telemetry_json, telemetry_prom))
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("CLAUDE_ENGINEER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "claude-engineer"))
+
+
+class DiskCache:
+    """String key/value store in a SQLite file under CACHE_DIR.
+
+    Entries older than ``ttl`` seconds are treated as missing, and when
+    ``max_entries`` is set the least recently used entries are evicted.
+    Any storage error is treated as a cache miss so a broken or read-only
+    cache directory never breaks the tool that uses it.
+    """
+
+    def __init__(self, namespace, cache_dir=None, ttl=None, max_entries=None):
+        self.path = os.path.join(cache_dir or CACHE_DIR, f"{namespace}.sqlite3")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        min_created = now - self.ttl if self.ttl else 0
+        try:
+            with self._lock:
+                conn = self._connect()
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, value FROM entries WHERE key IN ({placeholders}) AND created >= ?",
+                        chunk + [min_created]
+                    )
+                    found.update(rows)
+                if found and self.max_entries:
+                    conn.executemany("UPDATE entries SET accessed = ? WHERE key = ?", [(now, key) for key in found])
+                    conn.commit()
+        except (sqlite3.Error, OSError):
+            pass
+        return found
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, items):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    [(key, value, now, now) for key, value in items.items()]
+                )
+                if self.ttl:
+                    conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+                if self.max_entries:
+                    conn.execute(
+                        "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+                conn.commit()
+        except (sqlite3.Error, OSError):
+            pass
+
+    def clear(self):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM entries")
+                conn.commit()
+        except (sqlite3.Error, OSError):
+            pass
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+MODES = ("off", "record", "replay", "record-missing")
+CASSETTE_PATH = os.getenv("CLAUDE_ENGINEER_CASSETTE")
+CASSETTE_MODE = os.getenv("CLAUDE_ENGINEER_CASSETTE_MODE", "record-missing")
+# Request fields that decide the reply; max_tokens and cache_control markers are left out on purpose
+KEY_FIELDS = ("model", "system", "tools", "tool_choice", "messages")
+CWD_PLACEHOLDER = "<cwd>"
+# Modification times in list_files output ("name  1.2K  2024-06-01 12:00"), which differ between checkouts
+MTIME_PATTERN = re.compile(r"(  \d+(?:\.\d)?[BKMG]  )\d{4}-\d{2}-\d{2} \d{2}:\d{2}")
+MTIME_PLACEHOLDER = "<mtime>"
+
+
+class CassetteMiss(LookupError):
+    """Replay mode was asked for a request that was never recorded."""
+
+
+def _strip_cache_control(value):
+    if isinstance(value, dict):
+        return {key: _strip_cache_control(item) for key, item in value.items() if key != "cache_control"}
+    if isinstance(value, list):
+        return [_strip_cache_control(item) for item in value]
+    return value
+
+
+def request_key(request, cwd=None, regeneration=0):
+    """Hash of the parts of a Messages API request that determine the reply.
+
+    The working directory (the process's, if the session has none) and
+    the file modification times in directory listings are replaced by
+    placeholders, so a cassette recorded in one checkout or temporary
+    directory replays in another. max_tokens is left out, so a request
+    sent again with a larger budget after its reply was cut off needs a
+    regeneration number to get a key of its own.
+    """
+    fields = {field: request.get(field) for field in KEY_FIELDS}
+    if regeneration:
+        fields["regeneration"] = regeneration
+    canonical = json.dumps(
+        _strip_cache_control(fields),
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    cwd = cwd or os.getcwd()
+    if cwd != os.sep:
+        canonical = canonical.replace(cwd, CWD_PLACEHOLDER)
+    canonical = MTIME_PATTERN.sub(r"\1" + MTIME_PLACEHOLDER, canonical)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded Messages API replies, one JSON file per request hash in a directory.
+
+    Modes: "record" always calls the API and saves the reply, "replay"
+    only serves saved replies (a missing one raises CassetteMiss),
+    "record-missing" serves saved replies and records the rest, and "off"
+    does nothing. The files are plain JSON, so a cassette can be checked
+    in next to the scenario it replays.
+    """
+
+    def __init__(self, path, mode="record-missing"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.path = os.path.abspath(path)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    @property
+    def replays(self):
+        return self.mode in ("replay", "record-missing")
+
+    @property
+    def records(self):
+        return self.mode in ("record", "record-missing")
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def load(self, request, cwd=None, regeneration=0):
+        """The recorded reply for request, or None if it should be sent to the API."""
+        if not self.replays:
+            return None
+        key = request_key(request, cwd, regeneration)
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            if self.mode == "replay":
+                raise CassetteMiss(f"No recorded reply for this request (key {key[:12]}) in cassette {self.path}")
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry["response"]
+
+    def save(self, request, response, cwd=None, regeneration=0):
+        if not self.records:
+            return
+        key = request_key(request, cwd, regeneration)
+        messages = request.get("messages") or [{}]
+        entry = {
+            "key": key,
+            "model": request.get("model"),
+            "last_message": json.dumps(messages[-1], default=str)[:500],
+            "response": {
+                "content": response["content"],
+                "stop_reason": response["stop_reason"],
+                "usage": response.get("usage", {})
+            }
+        }
+        os.makedirs(self.path, exist_ok=True)
+        # Written to a temporary file and renamed, so a crash never leaves a half-written entry
+        tmp_path = f"{self._file(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=1, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self._file(key))
+        with self._lock:
+            self.recorded += 1
+
+    def summary(self):
+        return f"Cassette {self.path} ({self.mode}): {self.hits} replayed, {self.misses} missing, {self.recorded} recorded"
+
+
+def open_cassette(path=CASSETTE_PATH, mode=CASSETTE_MODE):
+    if not path or mode == "off":
+        return None
+    return Cassette(path, mode)
@@ -1,17 +1,21 @@
 import os
 import argparse
 import sys
-import json
 from dotenv import load_dotenv
-from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
 from colorama import init, Style
 import signal
-import re
-from .utils import (
-    print_colored, print_code, create_folder, create_file, tavily_search,
-    write_to_file, read_file, list_files, encode_image_to_base64,
-    USER_COLOR, CLAUDE_COLOR, TOOL_COLOR, RESULT_COLOR, ERROR_COLOR
-)
+from .utils import print_colored, USER_COLOR, CLAUDE_COLOR, TOOL_COLOR, ERROR_COLOR
+from . import goals
+from .cassette import open_cassette, MODES, CASSETTE_PATH, CASSETTE_MODE
+# Available Claude models and the default, used by --model and the routing policies
+from .routing import CLAUDE_MODELS, DEFAULT_MODEL, POLICIES, ROUTING_POLICY, get_policy
+from .session import Session, MAX_CONTINUATION_ITERATIONS
+
+# The helpers below the session are thin wrappers around it, kept for scripts that drive the CLI module directly
+__all__ = [
+    "session", "conversation_history", "check_api_keys", "execute_tool", "parse_goals", "update_system_prompt",
+    "chat_with_claude", "main"
+]
 
 # Initialize colorama
 init()
@@ -19,181 +23,11 @@ init()
 # Load environment variables
 load_dotenv()
 
-# Initialize the Anthropic client
-client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-# Set up the conversation memory
-conversation_history = []
-
-# Add these constants at the top of the file
-CONTINUATION_EXIT_PHRASE = "AUTOMODE_COMPLETE"
-MAX_CONTINUATION_ITERATIONS = 25
-# automode flag
-automode = False
-
-# Available Claude models
-CLAUDE_MODELS = {
-    "opus": "claude-3-opus-20240229",
-    "sonnet": "claude-3-sonnet-20240229",
-    "haiku": "claude-3-haiku-20240307"
-}
-
-# Default model
-DEFAULT_MODEL = "sonnet"
-
-# System prompt
-system_prompt = """
-You are Claude, an AI assistant powered by Anthropic's Claude-3.5-Sonnet model. You are an exceptional software developer with vast knowledge across multiple programming languages, frameworks, and best practices. Your capabilities include:
-
-1. Creating project structures, including folders and files
-2. Writing clean, efficient, and well-documented code
-3. Debugging complex issues and providing detailed explanations
-4. Offering architectural insights and design patterns
-5. Staying up-to-date with the latest technologies and industry trends
-6. Reading and analyzing existing files in the project directory
-7. Listing files in the root directory of the project
-8. Performing web searches to get up-to-date information or additional context
-9. When you use search make sure you use the best query to get the most accurate and up-to-date information
-10. IMPORTANT!! You NEVER remove existing code if doesnt require to be changed or removed, never use comments  like # ... (keep existing code) ... or # ... (rest of the code) ... etc, you only add new code or remove it or EDIT IT.
-11. Analyzing images provided by the user
-When an image is provided, carefully analyze its contents and incorporate your observations into your responses.
-
-When asked to create a project:
-- Always start by creating a root folder for the project.
-- Then, create the necessary subdirectories and files within that root folder.
-- Organize the project structure logically and follow best practices for the specific type of project being created.
-- Use the provided tools to create folders and files as needed.
-
-When asked to make edits or improvements:
-- Use the read_file tool to examine the contents of existing files.
-- Analyze the code and suggest improvements or make necessary edits.
-- Use the write_to_file tool to implement changes.
-
-Be sure to consider the type of project (e.g., Python, JavaScript, web application) when determining the appropriate structure and files to include.
-
-You can now read files, list the contents of the root folder where this script is being run, and perform web searches. Use these capabilities when:
-- The user asks for edits or improvements to existing files
-- You need to understand the current state of the project
-- You believe reading a file or listing directory contents will be beneficial to accomplish the user's goal
-- You need up-to-date information or additional context to answer a question accurately
-
-When you need current information or feel that a search could provide a better answer, use the tavily_search tool. This tool performs a web search and returns a concise answer along with relevant sources.
+# The interactive CLI drives a single default session
+session = Session()
 
-Always strive to provide the most accurate, helpful, and detailed responses possible. If you're unsure about something, admit it and consider using the search tool to find the most current information.
-
-{automode_status}
-
-When in automode:
-1. Set clear, achievable goals for yourself based on the user's request
-2. Work through these goals one by one, using the available tools as needed
-3. REMEMBER!! You can Read files, write code, LIST the files, and even SEARCH and make edits, use these tools as necessary to accomplish each goal
-4. ALWAYS READ A FILE BEFORE EDITING IT IF YOU ARE MISSING CONTENT. Provide regular updates on your progress
-5. IMPORTANT RULe!! When you know your goals are completed, DO NOT CONTINUE IN POINTLESS BACK AND FORTH CONVERSATIONS with yourself, if you think we achieved the results established to the original request say "AUTOMODE_COMPLETE" in your response to exit the loop!
-6. ULTRA IMPORTANT! You have access to this {iteration_info} amount of iterations you have left to complete the request, you can use this information to make decisions and to provide updates on your progress knowing the amount of responses you have left to complete the request.
-Answer the user's request using relevant tools (if they are available). Before calling a tool, do some analysis within <thinking></thinking> tags. First, think about which of the provided tools is the relevant tool to answer the user's request. Second, go through each of the required parameters of the relevant tool and determine if the user has directly provided or given enough information to infer a value. When deciding if the parameter can be inferred, carefully consider all the context to see if it supports a specific value. If all of the required parameters are present or can be reasonably inferred, close the thinking tag and proceed with the tool call. BUT, if one of the values for a required parameter is missing, DO NOT invoke the function (not even with fillers for the missing params) and instead, ask the user to provide the missing parameters. DO NOT ask for more information on optional parameters if it is not provided.
-
-"""
-
-# Initialize the Anthropic client
-client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-
-# Set up the conversation memory
-conversation_history = []
-
-# Define the tools
-tools = [
-    {
-        "name": "create_folder",
-        "description": "Create a new folder at the specified path. Use this when you need to create a new directory in the project structure.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "path": {
-                    "type": "string",
-                    "description": "The path where the folder should be created"
-                }
-            },
-            "required": ["path"]
-        }
-    },
-    {
-        "name": "create_file",
-        "description": "Create a new file at the specified path with optional content. Use this when you need to create a new file in the project structure.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "path": {
-                    "type": "string",
-                    "description": "The path where the file should be created"
-                },
-                "content": {
-                    "type": "string",
-                    "description": "The initial content of the file (optional)"
-                }
-            },
-            "required": ["path"]
-        }
-    },
-    {
-        "name": "write_to_file",
-        "description": "Write content to an existing file at the specified path. Use this when you need to add or update content in an existing file.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "path": {
-                    "type": "string",
-                    "description": "The path of the file to write to"
-                },
-                "content": {
-                    "type": "string",
-                    "description": "The content to write to the file"
-                }
-            },
-            "required": ["path", "content"]
-        }
-    },
-    {
-        "name": "read_file",
-        "description": "Read the contents of a file at the specified path. Use this when you need to examine the contents of an existing file.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "path": {
-                    "type": "string",
-                    "description": "The path of the file to read"
-                }
-            },
-            "required": ["path"]
-        }
-    },
-    {
-        "name": "list_files",
-        "description": "List all files and directories in the root folder where the script is running. Use this when you need to see the contents of the current directory.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "path": {
-                    "type": "string",
-                    "description": "The path of the folder to list (default: current directory)"
-                }
-            }
-        }
-    },
-    {
-        "name": "tavily_search",
-        "description": "Perform a web search using Tavily API to get up-to-date information or additional context. Use this when you need current information or feel a search could provide a better answer.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "The search query"
-                }
-            },
-            "required": ["query"]
-        }
-    }
-]
+# Set up the conversation memory, kept under a token budget
+conversation_history = session.history
 
 def check_api_keys():
     missing_keys = []
@@ -211,201 +45,133 @@ def check_api_keys():
     return True
 
 def execute_tool(tool_name, tool_args):
-    print_colored(f"Executing tool: {tool_name} with args: {tool_args}", TOOL_COLOR)
-    if tool_name == "create_folder":
-        result = create_folder(tool_args["path"])
-    elif tool_name == "create_file":
-        result = create_file(tool_args["path"], tool_args.get("content", ""))
-    elif tool_name == "write_to_file":
-        result = write_to_file(tool_args["path"], tool_args["content"])
-    elif tool_name == "read_file":
-        result = read_file(tool_args["path"])
-    elif tool_name == "list_files":
-        result = list_files(tool_args.get("path", "."))
-    elif tool_name == "tavily_search":
-        result = tavily_search(tool_args["query"])
-    else:
-        result = f"Unknown tool: {tool_name}"
-    
-    print_colored(f"Tool execution result: {result}", RESULT_COLOR)
-    return result
+    return session.execute_tool(tool_name, tool_args)
 
 def parse_goals(response):
-    goals = re.findall(r'Goal \d+: (.+)', response)
-    return goals
-
-def execute_goals(goals):
-    global automode
-    for i, goal in enumerate(goals, 1):
-        print_colored(f"\nExecuting Goal {i}: {goal}", TOOL_COLOR)
-        response, _ = chat_with_claude(f"Continue working on goal: {goal}")
-        if CONTINUATION_EXIT_PHRASE in response:
-            automode = False
-            print_colored("Exiting automode.", TOOL_COLOR)
-            break
+    return goals.parse_goals(response)
 
 def update_system_prompt(current_iteration=None, max_iterations=None):
-    global system_prompt
-    automode_status = "You are currently in automode." if automode else "You are not in automode."
-    iteration_info = ""
-    if current_iteration is not None and max_iterations is not None:
-        iteration_info = f"You are currently on iteration {current_iteration} out of {max_iterations} in automode."
-    return system_prompt.format(automode_status=automode_status, iteration_info=iteration_info)
-
-def process_and_display_response(response):
-    if response.startswith("Error") or response.startswith("I'm sorry"):
-        print_colored(response, TOOL_COLOR)
-    else:
-        if "```" in response:
-            parts = response.split("```")
-            for i, part in enumerate(parts):
-                if i % 2 == 0:
-                    print_colored(part, CLAUDE_COLOR)
-                else:
-                    lines = part.split('\n')
-                    language = lines[0].strip() if lines else ""
-                    code = '\n'.join(lines[1:]) if len(lines) > 1 else ""
-                    
-                    if language and code:
-                        print_code(code, language)
-                    elif code:
-                        print_colored(f"Code:\n{code}", CLAUDE_COLOR)
-                    else:
-                        print_colored(part, CLAUDE_COLOR)
-        else:
-            print_colored(response, CLAUDE_COLOR)
+    return session.system_prompt(current_iteration, max_iterations)
 
 def chat_with_claude(user_input, image_path=None, current_iteration=None, max_iterations=None):
-    global conversation_history, automode
-    
-    if image_path:
-        print_colored(f"Processing image at path: {image_path}", TOOL_COLOR)
-        image_base64 = encode_image_to_base64(image_path)
-        
-        if image_base64.startswith("Error"):
-            print_colored(f"Error encoding image: {image_base64}", TOOL_COLOR)
-            return "I'm sorry, there was an error processing the image. Please try again.", False
+    return session.chat(user_input, image_path, current_iteration, max_iterations)
 
-        image_message = {
-            "role": "user",
-            "content": [
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": "image/jpeg",
-                        "data": image_base64
-                    }
-                },
-                {
-                    "type": "text",
-                    "text": f"User input for image: {user_input}"
-                }
-            ]
-        }
-        conversation_history.append(image_message)
-        print_colored("Image message added to conversation history", TOOL_COLOR)
-    else:
-        conversation_history.append({"role": "user", "content": user_input})
-    
-    messages = [msg for msg in conversation_history if msg.get('content')]
-    
+def chat_interruptibly(user_input, image_path=None):
     try:
-        response = client.messages.create(
-            model="claude-3-5-sonnet-20240620",
-            max_tokens=4000,
-            system=update_system_prompt(current_iteration, max_iterations),
-            messages=messages,
-            tools=tools,
-            tool_choice={"type": "auto"}
-        )
-    except Exception as e:
-        print_colored(f"Error calling Claude API: {str(e)}", TOOL_COLOR)
-        return "I'm sorry, there was an error communicating with the AI. Please try again.", False
-    
-    assistant_response = ""
-    exit_continuation = False
-    
-    for content_block in response.content:
-        if content_block.type == "text":
-            assistant_response += content_block.text
-            print_colored(f"\nClaude: {content_block.text}", CLAUDE_COLOR)
-            if CONTINUATION_EXIT_PHRASE in content_block.text:
-                exit_continuation = True
-        elif content_block.type == "tool_use":
-            tool_name = content_block.name
-            tool_input = content_block.input
-            tool_use_id = content_block.id
-            
-            print_colored(f"\nTool Used: {tool_name}", TOOL_COLOR)
-            print_colored(f"Tool Input: {tool_input}", TOOL_COLOR)
-            
-            result = execute_tool(tool_name, tool_input)
-            print_colored(f"Tool Result: {result}", RESULT_COLOR)
-            
-            conversation_history.append({"role": "assistant", "content": [content_block]})
-            conversation_history.append({
-                "role": "user",
-                "content": [
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": result
-                    }
-                ]
-            })
-            
-            try:
-                tool_response = client.messages.create(
-                    model="claude-3-5-sonnet-20240620",
-                    max_tokens=4000,
-                    system=update_system_prompt(current_iteration, max_iterations),
-                    messages=[msg for msg in conversation_history if msg.get('content')],
-                    tools=tools,
-                    tool_choice={"type": "auto"}
-                )
-                
-                for tool_content_block in tool_response.content:
-                    if tool_content_block.type == "text":
-                        assistant_response += tool_content_block.text
-                        print_colored(f"\nClaude: {tool_content_block.text}", CLAUDE_COLOR)
-            except Exception as e:
-                print_colored(f"Error in tool response: {str(e)}", TOOL_COLOR)
-                assistant_response += "\nI encountered an error while processing the tool result. Please try again."
-    
-    if assistant_response:
-        conversation_history.append({"role": "assistant", "content": assistant_response})
-    
-    return assistant_response, exit_continuation
+        return chat_with_claude(user_input, image_path)
+    except KeyboardInterrupt:
+        print_colored("\nRequest cancelled. Returning to the prompt.", TOOL_COLOR)
+        return None, False
 
 def signal_handler(sig, frame):
     print_colored("\nExiting gracefully...", TOOL_COLOR)
     sys.exit(0)
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Claude Engineer interactive CLI")
+    parser.add_argument("--prompt-cache", action="store_true", help="Cache the system prompt, tool schemas and conversation prefix between requests")
+    parser.add_argument("--resume", metavar="SESSION", help="Continue a saved session: its id, a unique id prefix, 'last', or a journal file")
+    parser.add_argument("--telemetry-json", metavar="PATH", help="Write token, latency and tool timing metrics to this JSON file after every turn")
+    parser.add_argument("--telemetry-prom", metavar="PATH", help="Write the same metrics in Prometheus textfile format")
+    parser.add_argument("--no-journal", action="store_true", help="Do not save this session's history to disk")
+    parser.add_argument("--model", choices=sorted(CLAUDE_MODELS), default=DEFAULT_MODEL, help=f"Model for planning turns (default: {DEFAULT_MODEL})")
+    parser.add_argument("--routing", metavar="POLICY", default=ROUTING_POLICY, help=f"Which model serves which requests: {', '.join(POLICIES)}, or e.g. 'plan=sonnet,tool_followup=haiku:2000' (default: {ROUTING_POLICY})")
+    parser.add_argument("--cassette", metavar="DIR", default=CASSETTE_PATH, help="Record API replies to, or replay them from, this directory (also CLAUDE_ENGINEER_CASSETTE)")
+    parser.add_argument("--cassette-mode", choices=MODES, default=CASSETTE_MODE, help="off, record, replay (never call the API) or record-missing (default)")
+    parser.add_argument("--parallel-goals", type=int, metavar="N", help="Work on up to N independent automode goals at once (default: 1, one goal at a time)")
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser("batch", help="Run jobs from a JSONL file headlessly, several at a time")
+    batch_parser.add_argument("jobs", help="JSONL file with one job per line")
+    batch_parser.add_argument("--concurrency", type=int, default=4, help="Number of jobs to run at once (default: 4)")
+    batch_parser.add_argument("--output-dir", default="batch_results", help="Directory for per-job result files (default: batch_results)")
+    return parser.parse_args(argv)
+
 def main():
-    signal.signal(signal.SIGINT, signal_handler)
+    args = parse_args()
+    if args.prompt_cache:
+        session.prompt_cache = True
+    if args.parallel_goals is not None:
+        session.parallel_goals = args.parallel_goals
+    session.cassette = open_cassette(args.cassette, args.cassette_mode)
+    session.model = CLAUDE_MODELS[args.model]
+    try:
+        session.routing = get_policy(args.routing)
+    except ValueError as e:
+        print_colored(str(e), ERROR_COLOR)
+        sys.exit(1)
+    session.telemetry.json_path = args.telemetry_json
+    session.telemetry.prometheus_path = args.telemetry_prom
+
+    if args.command == "batch":
+        from .batch import run_batch
+        results = run_batch(args.jobs, args.output_dir, args.concurrency, prompt_cache=args.prompt_cache,
+                            cassette=session.cassette, routing=session.routing, model=session.model,
+                            telemetry_json=args.telemetry_json, telemetry_prom=args.telemetry_prom)
+        if session.cassette:
+            print_colored(session.cassette.summary(), TOOL_COLOR)
+        sys.exit(0 if all(result["status"] == "ok" for result in results) else 1)
+
+    if args.resume:
+        from .journal import find_session
+        try:
+            journal = find_session(args.resume)
+            count = session.resume(journal)
+        except (OSError, ValueError) as e:
+            print_colored(f"Could not resume session '{args.resume}': {str(e)}", ERROR_COLOR)
+            sys.exit(1)
+        print_colored(f"Resumed session {journal.session_id} with {count} messages.", TOOL_COLOR)
+    elif not args.no_journal:
+        from .journal import Journal
+        journal = Journal()
+        session.start_journal(journal)
+        print_colored(f"Session {journal.session_id} is saved as it goes. Continue it later with --resume {journal.session_id}", TOOL_COLOR)
+
+    # Ctrl+C cancels the request in flight (see Session); SIGTERM still exits right away
+    signal.signal(signal.SIGTERM, signal_handler)
 
-    global automode, conversation_history
     print_colored("Welcome to the Claude-3.5-Sonnet Engineer Chat with Image Support!", CLAUDE_COLOR)
     print_colored("Type 'exit' to end the conversation.", CLAUDE_COLOR)
     print_colored("Type 'image' to include an image in your message.", CLAUDE_COLOR)
+    print_colored("Type '/stats' to see token usage, latency, cost and tool timings for this session.", CLAUDE_COLOR)
+    print_colored(f"Type '/route [policy]' to see or change which model serves which requests ({', '.join(POLICIES)}).", CLAUDE_COLOR)
     print_colored("Type 'automode [number]' to enter Autonomous mode with a specific number of iterations.", CLAUDE_COLOR)
     print_colored("While in automode, press Ctrl+C at any time to exit the automode to return to regular chat.", CLAUDE_COLOR)
+    print_colored("Press Ctrl+C while Claude is replying to cancel the request.", CLAUDE_COLOR)
     
     while True:
-        user_input = input(f"\n{USER_COLOR}You: {Style.RESET_ALL}")
+        try:
+            user_input = input(f"\n{USER_COLOR}You: {Style.RESET_ALL}")
+        except (KeyboardInterrupt, EOFError):
+            print_colored("\nExiting gracefully...", TOOL_COLOR)
+            break
         
         if user_input.lower() == 'exit':
             print_colored("Thank you for chatting. Goodbye!", CLAUDE_COLOR)
             break
         
+        if user_input.strip().lower() == '/stats':
+            print_colored(session.telemetry.summary(), TOOL_COLOR)
+            if session.cassette:
+                print_colored(session.cassette.summary(), TOOL_COLOR)
+            continue
+
+        if user_input.strip().lower().startswith('/route'):
+            policy = user_input.strip()[len('/route'):].strip()
+            if policy:
+                try:
+                    session.routing = get_policy(policy)
+                except ValueError as e:
+                    print_colored(str(e), ERROR_COLOR)
+                    continue
+            print_colored(f"Routing {session.routing.describe(session.model)}", TOOL_COLOR)
+            continue
+
         if user_input.lower() == 'image':
             image_path = input(f"{USER_COLOR}Drag and drop your image here: {Style.RESET_ALL}").strip().replace("'", "")
             
             if os.path.isfile(image_path):
                 user_input = input(f"{USER_COLOR}You (prompt for image): {Style.RESET_ALL}")
-                response, _ = chat_with_claude(user_input, image_path)
-                process_and_display_response(response)
+                chat_interruptibly(user_input, image_path)
             else:
                 print_colored("Invalid image path. Please try again.", CLAUDE_COLOR)
                 continue
@@ -417,47 +183,19 @@ def main():
                 else:
                     max_iterations = MAX_CONTINUATION_ITERATIONS
                 
-                automode = True
                 print_colored(f"Entering automode with {max_iterations} iterations. Press Ctrl+C to exit automode at any time.", TOOL_COLOR)
                 print_colored("Press Ctrl+C at any time to exit the automode loop.", TOOL_COLOR)
                 user_input = input(f"\n{USER_COLOR}You: {Style.RESET_ALL}")
                 
-                iteration_count = 0
-                try:
-                    while automode and iteration_count < max_iterations:
-                        response, exit_continuation = chat_with_claude(user_input, current_iteration=iteration_count+1, max_iterations=max_iterations)
-                        process_and_display_response(response)
-                        
-                        if exit_continuation or CONTINUATION_EXIT_PHRASE in response:
-                            print_colored("Automode completed.", TOOL_COLOR)
-                            automode = False
-                        else:
-                            print_colored(f"Continuation iteration {iteration_count + 1} completed.", TOOL_COLOR)
-                            print_colored("Press Ctrl+C to exit automode.", TOOL_COLOR)
-                            user_input = "Continue with the next step."
-                        
-                        iteration_count += 1
-                        
-                        if iteration_count >= max_iterations:
-                            print_colored("Max iterations reached. Exiting automode.", TOOL_COLOR)
-                            automode = False
-                except KeyboardInterrupt:
-                    print_colored("\nAutomode interrupted by user. Exiting automode.", TOOL_COLOR)
-                    automode = False
-                    # Ensure the conversation history ends with an assistant message
-                    if conversation_history and conversation_history[-1]["role"] == "user":
-                        conversation_history.append({"role": "assistant", "content": "Automode interrupted. How can I assist you further?"})
+                session.run_automode(user_input, max_iterations)
             except KeyboardInterrupt:
+                # The cancelled request has already been closed off in the history
                 print_colored("\nAutomode interrupted by user. Exiting automode.", TOOL_COLOR)
-                automode = False
-                # Ensure the conversation history ends with an assistant message
-                if conversation_history and conversation_history[-1]["role"] == "user":
-                    conversation_history.append({"role": "assistant", "content": "Automode interrupted. How can I assist you further?"})
+                session.end_interrupted_turn()
             
             print_colored("Exited automode. Returning to regular chat.", TOOL_COLOR)
         else:
-            response, _ = chat_with_claude(user_input)
-            process_and_display_response(response)
+            chat_interruptibly(user_input)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
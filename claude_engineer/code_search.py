@@ -0,0 +1,435 @@
+import fnmatch
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+from .cache import CACHE_DIR
+from . import file_index
+
+INDEX_VERSION = 2
+# Files larger than this, or with a NUL byte near the start, are not indexed
+MAX_INDEX_FILE_BYTES = 1_000_000
+BINARY_SNIFF_BYTES = 8192
+DEFAULT_MAX_RESULTS = 50
+# Results stop once they reach about this many tokens
+SEARCH_TOKEN_BUDGET = 4000
+CHARS_PER_TOKEN = 4
+MAX_LINE_CHARS = 300
+# Trees with more entries than this (after .gitignore) are not indexed; search a smaller directory instead
+MAX_INDEX_ENTRIES = 100_000
+
+# Definitions found by symbol lookups, by file extension
+_PY = [("function", r"^\s*(?:async\s+)?def\s+(\w+)"), ("class", r"^\s*class\s+(\w+)")]
+_JS = [
+    ("function", r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)"),
+    ("class", r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(\w+)"),
+    ("function", r"^\s*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>"),
+    ("type", r"^\s*(?:export\s+)?(?:interface|type|enum)\s+(\w+)"),
+]
+_C_LIKE = [
+    ("class", r"^\s*(?:public\s+|private\s+|protected\s+|internal\s+|abstract\s+|final\s+|static\s+|sealed\s+)*(?:class|interface|struct|enum|record)\s+(\w+)"),
+    ("function", r"^\s*(?:[\w<>\[\],*&:]+\s+)+\**(\w+)\s*\([^;]*$"),
+]
+SYMBOL_PATTERNS = {
+    ".py": _PY, ".pyi": _PY,
+    ".js": _JS, ".jsx": _JS, ".ts": _JS, ".tsx": _JS, ".mjs": _JS, ".cjs": _JS,
+    ".go": [("function", r"^func\s+(?:\([^)]*\)\s*)?(\w+)"), ("type", r"^type\s+(\w+)")],
+    ".rs": [("function", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+(\w+)"),
+            ("type", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|type)\s+(\w+)")],
+    ".rb": [("function", r"^\s*def\s+(?:self\.)?(\w+[?!=]?)"), ("class", r"^\s*(?:class|module)\s+(\w+)")],
+    ".java": _C_LIKE, ".kt": _C_LIKE, ".cs": _C_LIKE, ".c": _C_LIKE, ".h": _C_LIKE,
+    ".cc": _C_LIKE, ".cpp": _C_LIKE, ".hpp": _C_LIKE, ".swift": _C_LIKE, ".php": _C_LIKE,
+}
+_COMPILED_SYMBOL_PATTERNS = {}
+_C_KEYWORDS = {"if", "for", "while", "switch", "return", "catch", "sizeof", "else", "new", "delete"}
+
+
+def _symbol_patterns(extension):
+    compiled = _COMPILED_SYMBOL_PATTERNS.get(extension)
+    if compiled is None:
+        compiled = [(kind, re.compile(pattern)) for kind, pattern in SYMBOL_PATTERNS.get(extension, [])]
+        _COMPILED_SYMBOL_PATTERNS[extension] = compiled
+    return compiled
+
+
+def extract_symbols(path, text):
+    patterns = _symbol_patterns(os.path.splitext(path)[1].lower())
+    if not patterns:
+        return []
+    symbols = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        for kind, pattern in patterns:
+            match = pattern.match(line)
+            if match and match.group(1) not in _C_KEYWORDS:
+                symbols.append((match.group(1), kind, line_number))
+                break
+    return symbols
+
+
+def trigrams(text):
+    # Matches never span lines, so trigrams are taken per distinct line (repeated lines are common in code)
+    found = set()
+    for line in set(text.lower().split("\n")):
+        found.update(line[i:i + 3] for i in range(len(line) - 2))
+    return found
+
+
+def _literal_runs(parsed):
+    runs = []
+    current = []
+    for op, value in parsed:
+        name = str(op)
+        if name == "LITERAL":
+            current.append(chr(value))
+            continue
+        if current:
+            runs.append("".join(current))
+            current = []
+        # Everything in a group, or in something repeated at least once, is still required
+        if name == "SUBPATTERN":
+            runs.extend(_literal_runs(value[-1]))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and value[0] >= 1:
+            runs.extend(_literal_runs(value[2]))
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+def required_literals(pattern):
+    """Literal strings every match of a regex must contain, for narrowing candidates by trigram."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+    return [run for run in _literal_runs(parsed) if len(run) >= 3]
+
+
+def _is_binary(path):
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(BINARY_SNIFF_BYTES)
+    except OSError:
+        return True
+
+
+class CodeIndex:
+    """Trigram and symbol index of the text files under one root, kept in SQLite.
+
+    Each query first brings the index up to date: files whose size or mtime
+    changed are re-indexed, new ones are added and deleted ones dropped. A
+    query is answered by intersecting the trigram posting lists of its
+    literal parts and then checking only the candidate files.
+    """
+
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        if db_path is None:
+            digest = hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:16]
+            db_path = os.path.join(CACHE_DIR, "code_index", f"{digest}.sqlite3")
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(INDEX_VERSION):
+                conn.executescript("""
+                    DROP TABLE IF EXISTS files;
+                    DROP TABLE IF EXISTS trigrams;
+                    DROP INDEX IF EXISTS trigrams_by_file;
+                    DROP TABLE IF EXISTS symbols;
+                """)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,
+                                                  mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL,
+                                                  trigrams TEXT NOT NULL DEFAULT '');
+                CREATE TABLE IF NOT EXISTS trigrams (trigram TEXT NOT NULL, file_id INTEGER NOT NULL,
+                                                     PRIMARY KEY (trigram, file_id)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS symbols (name TEXT NOT NULL, kind TEXT NOT NULL,
+                                                    file_id INTEGER NOT NULL, line INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (name COLLATE NOCASE);
+                CREATE INDEX IF NOT EXISTS symbols_by_file ON symbols (file_id);
+            """)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(INDEX_VERSION),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _rel(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def _abs(self, rel):
+        return os.path.join(self.root, *rel.split("/"))
+
+    def _remove(self, conn, file_id):
+        # Each file row keeps its own trigram list, so its postings are deleted by primary key
+        # instead of through a second index on file_id that would slow every insert
+        row = conn.execute("SELECT trigrams FROM files WHERE id = ?", (file_id,)).fetchone()
+        if row and row[0]:
+            conn.executemany("DELETE FROM trigrams WHERE trigram = ? AND file_id = ?",
+                             ((trigram, file_id) for trigram in row[0].split("\0")))
+        conn.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+        conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _index_file(self, conn, rel, mtime_ns, size, file_id=None):
+        if file_id is not None:
+            self._remove(conn, file_id)
+        path = self._abs(rel)
+        text = ""
+        if size <= MAX_INDEX_FILE_BYTES and not _is_binary(path):
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                return
+        found = sorted(trigrams(text)) if text else []
+        # Skipped files are still recorded, so they are not re-read on every refresh
+        cursor = conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, trigrams) VALUES (?, ?, ?, ?)",
+            (rel, mtime_ns, size, "\0".join(found))
+        )
+        file_id = cursor.lastrowid
+        if text:
+            conn.executemany("INSERT INTO trigrams (trigram, file_id) VALUES (?, ?)",
+                             ((trigram, file_id) for trigram in found))
+            conn.executemany("INSERT INTO symbols (name, kind, file_id, line) VALUES (?, ?, ?, ?)",
+                             ((name, kind, file_id, line) for name, kind, line in extract_symbols(rel, text)))
+
+    def refresh(self):
+        """Bring the index up to date with the files on disk; returns the number of files (re)indexed.
+
+        The file index's cached directory listings say which files exist,
+        but every file is stat'ed again here: an editor that rewrites a
+        file in place leaves its directory's mtime, and so the cached
+        listing, unchanged.
+        """
+        entries, _ = file_index.get_index(self.root).walk("", max_entries=MAX_INDEX_ENTRIES)
+        if len(entries) > MAX_INDEX_ENTRIES:
+            raise ValueError(f"{self.root} has more than {MAX_INDEX_ENTRIES} files and folders, too many to index; "
+                             "search a smaller directory or a git repository")
+        changed = 0
+        with self._lock:
+            conn = self._connect()
+            known = {path: (file_id, mtime_ns, size)
+                     for file_id, path, mtime_ns, size in conn.execute("SELECT id, path, mtime_ns, size FROM files")}
+            for rel, _, is_dir, _, _ in entries:
+                if is_dir:
+                    continue
+                try:
+                    st = os.stat(self._abs(rel))
+                except OSError:
+                    continue
+                current = known.pop(rel, None)
+                if current is not None and current[1] == st.st_mtime_ns and current[2] == st.st_size:
+                    continue
+                self._index_file(conn, rel, st.st_mtime_ns, st.st_size, current[0] if current else None)
+                changed += 1
+            for file_id, _, _ in known.values():
+                self._remove(conn, file_id)
+                changed += 1
+            conn.commit()
+        return changed
+
+    def update_file(self, path):
+        """Re-index one file right away (or drop it if it is gone)."""
+        rel = self._rel(path)
+        if rel.startswith(".."):
+            return
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT id FROM files WHERE path = ?", (rel,)).fetchone()
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is None or not os.path.isfile(path):
+                if row:
+                    self._remove(conn, row[0])
+            else:
+                self._index_file(conn, rel, st.st_mtime_ns, st.st_size, row[0] if row else None)
+            conn.commit()
+
+    def candidates(self, literals, prefix="", glob=None):
+        """Paths of indexed files that contain every literal (case-insensitively)."""
+        needed = set()
+        for literal in literals:
+            needed |= trigrams(literal)
+        with self._lock:
+            conn = self._connect()
+            if needed:
+                placeholders = ",".join("?" * len(needed))
+                rows = conn.execute(
+                    f"SELECT path FROM files WHERE id IN (SELECT file_id FROM trigrams WHERE trigram IN ({placeholders}) "
+                    f"GROUP BY file_id HAVING COUNT(*) = ?) ORDER BY path",
+                    list(needed) + [len(needed)]
+                )
+            else:
+                rows = conn.execute("SELECT path FROM files ORDER BY path")
+            paths = [row[0] for row in rows]
+        if prefix:
+            paths = [path for path in paths if path.startswith(prefix + "/")]
+        if glob:
+            paths = [path for path in paths
+                     if fnmatch.fnmatch(path, glob) or fnmatch.fnmatch(path.rsplit("/", 1)[-1], glob)]
+        return paths
+
+    def find_symbols(self, name, prefix="", glob=None):
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT files.path, symbols.line, symbols.kind, symbols.name FROM symbols "
+                "JOIN files ON files.id = symbols.file_id WHERE symbols.name = ? COLLATE NOCASE "
+                "ORDER BY symbols.name != ?, files.path, symbols.line",
+                (name, name)
+            ).fetchall()
+        if prefix:
+            rows = [row for row in rows if row[0].startswith(prefix + "/")]
+        if glob:
+            rows = [row for row in rows if fnmatch.fnmatch(row[0], glob) or fnmatch.fnmatch(row[0].rsplit("/", 1)[-1], glob)]
+        return rows
+
+    def read_lines(self, rel):
+        try:
+            with open(self._abs(rel), encoding="utf-8", errors="replace") as f:
+                return f.read().splitlines()
+        except OSError:
+            return []
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_code_index(root):
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = CodeIndex(root)
+        return index
+
+
+def notify_changed(path):
+    """Re-index a file written by a tool in every loaded index that covers it."""
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        indexes = [index for root, index in _indexes.items() if path.startswith(root + os.sep)]
+    for index in indexes:
+        try:
+            index.update_file(path)
+        except sqlite3.Error:
+            pass
+
+
+def _clip(line):
+    return line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS] + " ..."
+
+
+def _snippet(rel, lines, hits, context):
+    """ripgrep-style lines: 'path:N: text' for hits and 'path-N- text' for context."""
+    shown = []
+    last = 0
+    hit_set = set(hits)
+    for hit in hits:
+        start = max(hit - context, last + 1, 1)
+        end = min(hit + context, len(lines))
+        if shown and start > last + 1:
+            shown.append("--")
+        for number in range(start, end + 1):
+            separator = ":" if number in hit_set else "-"
+            shown.append(f"{rel}{separator}{number}{separator} {_clip(lines[number - 1])}")
+        last = end
+    return shown
+
+
+def _multiline_hits(lines, regex):
+    """Line numbers covered by each match of regex against the whole file."""
+    text = "\n".join(lines)
+    hits = []
+    for match in regex.finditer(text):
+        first = text.count("\n", 0, match.start()) + 1
+        last = first + match.group().count("\n")
+        hits.extend(number for number in range(first, last + 1) if not hits or number > hits[-1])
+    return hits
+
+
+def search_code(query, mode="literal", path=".", glob=None, case_sensitive=False, context=1,
+                max_results=DEFAULT_MAX_RESULTS, max_tokens=SEARCH_TOKEN_BUDGET):
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        raise NotADirectoryError(f"Not a directory: {path}")
+    index = get_code_index(file_index.find_root(path))
+    updated = index.refresh()
+    prefix = os.path.relpath(path, index.root).replace(os.sep, "/")
+    prefix = "" if prefix == "." else prefix
+
+    flags = 0 if case_sensitive else re.IGNORECASE
+    if mode == "symbol":
+        rows = index.find_symbols(query, prefix, glob)
+        hits_by_file = {}
+        for rel, line, kind, name in rows:
+            hits_by_file.setdefault(rel, []).append(line)
+        description = f"definitions of '{query}'"
+    else:
+        if mode == "regex":
+            regex = re.compile(query, flags)
+            literals = required_literals(query)
+        elif mode == "literal":
+            query = query.replace("\r\n", "\n")
+            regex = re.compile(re.escape(query), flags)
+            literals = [part for part in query.split("\n") if len(part) >= 3]
+        else:
+            raise ValueError(f"Unknown search mode: {mode}")
+        # A literal with a newline in it can only match across lines
+        multiline = mode == "literal" and "\n" in query
+        hits_by_file = {}
+        for rel in index.candidates(literals, prefix, glob):
+            lines = index.read_lines(rel)
+            if multiline:
+                hits = _multiline_hits(lines, regex)
+            else:
+                hits = [number for number, line in enumerate(lines, 1) if regex.search(line)]
+            if hits:
+                hits_by_file[rel] = hits
+        description = f"matches for {mode} '{query}'"
+
+    total_hits = sum(len(hits) for hits in hits_by_file.values())
+    budget = max_tokens * CHARS_PER_TOKEN
+    output = []
+    shown_hits = 0
+    for rel, hits in hits_by_file.items():
+        remaining = max_results - shown_hits
+        if remaining <= 0 or budget <= 0:
+            break
+        hits = sorted(set(hits))[:remaining]
+        lines = index.read_lines(rel)
+        block = _snippet(rel, lines, hits, context) if lines else [f"{rel}:{hit}:" for hit in hits]
+        block_chars = sum(len(line) + 1 for line in block)
+        if output and block_chars > budget:
+            break
+        output.extend(block)
+        budget -= block_chars
+        shown_hits += len(hits)
+
+    header = f"[{total_hits} {description} in {len(hits_by_file)} files | paths are relative to {index.root}"
+    if updated:
+        header += f" | index updated for {updated} files"
+    header += "]"
+    if not total_hits:
+        return header
+    result = [header] + output
+    if shown_hits < total_hits:
+        result.append(f"[... {total_hits - shown_hits} more matches not shown. Narrow the query, path or glob.]")
+    return "\n".join(result)
@@ -0,0 +1,69 @@
+import asyncio
+import concurrent.futures
+import threading
+
+# How long to wait for a cancelled task to finish its cleanup after Ctrl+C
+CANCEL_TIMEOUT = 10
+
+
+class Engine:
+    """Runs coroutines on one background event loop shared by every session.
+
+    Synchronous callers block in run(). If they are interrupted (Ctrl+C), the
+    task is cancelled inside the loop and given a chance to clean up before
+    KeyboardInterrupt is re-raised in the caller.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="claude-engineer-engine", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def run(self, coro):
+        if self.in_loop():
+            raise RuntimeError("Engine.run() cannot be called from inside the engine loop; await the coroutine instead")
+        loop = self.loop
+        task_box = {}
+
+        async def runner():
+            task_box["task"] = asyncio.ensure_future(coro)
+            return await task_box["task"]
+
+        future = asyncio.run_coroutine_threadsafe(runner(), loop)
+        try:
+            return future.result()
+        except KeyboardInterrupt:
+            def cancel():
+                task = task_box.get("task")
+                if task is not None:
+                    task.cancel()
+                else:
+                    future.cancel()
+            loop.call_soon_threadsafe(cancel)
+            try:
+                future.result(timeout=CANCEL_TIMEOUT)
+            except (concurrent.futures.CancelledError, concurrent.futures.TimeoutError, Exception):
+                pass
+            raise
+
+
+engine = Engine()
+
+
+def run(coro):
+    return engine.run(coro)
@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+
+# Paths listed in a batch summary before it is cut short
+MAX_SUMMARY_PATHS = 60
+STAGING_PREFIX = ".claude-engineer-batch-"
+
+
+class BatchError(ValueError):
+    """A batch that cannot be written as given; nothing was changed."""
+
+
+class BatchResult:
+    def __init__(self, base):
+        self.base = base
+        self.created_dirs = []
+        self.written = []
+        self.replaced = []
+        self.sizes = {}
+        self.warnings = []
+
+    def summary(self):
+        replaced = set(self.replaced)
+        lines = [
+            f"Wrote {len(self.written)} files ({sum(self.sizes.values())} bytes, {len(replaced)} replaced) "
+            f"and created {len(self.created_dirs)} folders under {self.base}"
+        ]
+        entries = [(os.path.relpath(path, self.base) + "/", "") for path in self.created_dirs]
+        for path in self.written:
+            note = f" {self.sizes[path]} bytes" + (" (replaced)" if path in replaced else "")
+            entries.append((os.path.relpath(path, self.base), note))
+        entries.sort()
+        lines.extend(f"  {rel}{note}" for rel, note in entries[:MAX_SUMMARY_PATHS])
+        if len(entries) > MAX_SUMMARY_PATHS:
+            lines.append(f"  [... {len(entries) - MAX_SUMMARY_PATHS} more]")
+        lines.extend(f"Warning: {warning}" for warning in self.warnings)
+        return "\n".join(lines)
+
+
+def _existing_ancestor(path):
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _check(folders, files):
+    if not folders and not files:
+        raise BatchError("The batch is empty")
+    file_paths = set()
+    for path, _ in files:
+        if path in file_paths:
+            raise BatchError(f"{path} appears more than once")
+        if os.path.isdir(path):
+            raise BatchError(f"{path} is an existing folder")
+        file_paths.add(path)
+    for folder in folders:
+        if folder in file_paths or os.path.isfile(folder):
+            raise BatchError(f"{folder} is listed as a folder but is a file")
+    for path in list(file_paths) + folders:
+        parent = os.path.dirname(path)
+        while not os.path.isdir(parent):
+            if parent in file_paths or os.path.exists(parent):
+                raise BatchError(f"{path} would be inside {parent}, which is a file")
+            parent = os.path.dirname(parent)
+
+
+def _fsync_dir(path):
+    # Folders cannot be opened for syncing on Windows, where rename is durable on its own
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _rollback(result, moved, backups):
+    for path in reversed(moved):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    for backup, path in reversed(backups):
+        try:
+            os.replace(backup, path)
+        except OSError:
+            pass
+    for directory in reversed(result.created_dirs):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+
+def write_batch(folders=None, files=None):
+    """Create folders and write files as one all-or-nothing operation.
+
+    files is a list of {"path", "content"}. Every file is first written
+    into a staging directory on the same filesystem, then moved into
+    place by rename. If any step fails, the renames already done are
+    undone and replaced files are restored. Syncing the folders after the
+    last rename can no longer undo anything, so failures there are only
+    listed in result.warnings.
+    """
+    folders = [os.path.abspath(folder) for folder in folders or ()]
+    files = [(os.path.abspath(entry["path"]), entry.get("content", "")) for entry in files or ()]
+    _check(folders, files)
+    targets = folders + [path for path, _ in files]
+    base = os.path.commonpath(targets) if len(targets) > 1 else os.path.dirname(targets[0])
+    result = BatchResult(base)
+    staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=_existing_ancestor(base))
+    moved = []
+    backups = []
+    try:
+        staged = []
+        for number, (path, content) in enumerate(files):
+            staged_path = os.path.join(staging, str(number))
+            with open(staged_path, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            result.sizes[path] = os.path.getsize(staged_path)
+            staged.append((staged_path, path))
+
+        for directory in sorted(set(folders + [os.path.dirname(path) for path, _ in files])):
+            missing = []
+            while not os.path.isdir(directory):
+                missing.append(directory)
+                directory = os.path.dirname(directory)
+            for new_dir in reversed(missing):
+                os.mkdir(new_dir)
+                result.created_dirs.append(new_dir)
+        for number, (staged_path, path) in enumerate(staged):
+            if os.path.exists(path):
+                shutil.copymode(path, staged_path)
+                backup = os.path.join(staging, f"{number}.orig")
+                os.replace(path, backup)
+                backups.append((backup, path))
+                result.replaced.append(path)
+            os.replace(staged_path, path)
+            moved.append(path)
+            result.written.append(path)
+    except BaseException:
+        _rollback(result, moved, backups)
+        raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    # The renames and new folders are only durable once the folders holding them are synced. Every
+    # rename has already landed by now, so a failure here is reported instead of rolled back
+    for directory in sorted({os.path.dirname(path) for path in result.created_dirs + result.written}):
+        try:
+            _fsync_dir(directory)
+        except OSError as e:
+            result.warnings.append(f"could not sync {directory} to disk: {e}")
+    return result
@@ -0,0 +1,201 @@
+import os
+import re
+import stat
+import tempfile
+
+# Lines of -/+ output shown in an edit summary before it is cut short
+MAX_SUMMARY_LINES = 40
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class EditError(ValueError):
+    """An edit that does not apply to the file as it is now; nothing was written."""
+
+
+def _line_at(text, pos):
+    return text.count("\n", 0, pos) + 1
+
+
+def apply_replacements(text, edits):
+    """Apply search/replace edits to text, all against the original.
+
+    Every search string must occur exactly once unless the edit sets
+    replace_all. Returns the new text and a list of (line, old, new)
+    changes for the summary.
+    """
+    spans = []
+    for number, edit in enumerate(edits, 1):
+        search = edit.get("search", "")
+        replace = edit.get("replace", "")
+        if not search:
+            raise EditError(f"Edit {number}: search text is empty")
+        positions = []
+        pos = text.find(search)
+        while pos != -1:
+            positions.append(pos)
+            pos = text.find(search, pos + len(search))
+        if not positions:
+            raise EditError(f"Edit {number}: search text not found. Read the file again and copy the text exactly, "
+                            f"including indentation")
+        if len(positions) > 1 and not edit.get("replace_all"):
+            lines = ", ".join(str(_line_at(text, pos)) for pos in positions[:10])
+            raise EditError(f"Edit {number}: search text matches {len(positions)} places (lines {lines}). "
+                            f"Include more surrounding lines, or set replace_all")
+        spans.extend((pos, pos + len(search), replace, number) for pos in positions)
+
+    spans.sort()
+    for (start, end, _, first), (next_start, _, _, second) in zip(spans, spans[1:]):
+        if next_start < end:
+            raise EditError(f"Edits {first} and {second} overlap at line {_line_at(text, next_start)}")
+
+    parts = []
+    changes = []
+    last = 0
+    line = 1
+    for start, end, replace, _ in spans:
+        line += text.count("\n", last, start)
+        parts.append(text[last:start])
+        parts.append(replace)
+        changes.append((line, text[start:end].split("\n"), replace.split("\n")))
+        line += text.count("\n", start, end)
+        last = end
+    parts.append(text[last:])
+    return "".join(parts), changes
+
+
+def parse_unified_diff(diff):
+    """Hunks of a unified diff for one file, as (old_start, old_lines, new_lines)."""
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith("\\"):
+            # File headers before the first hunk, and "\ No newline at end of file"
+            continue
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith(" ") or line == "":
+            current[1].append(line[1:])
+            current[2].append(line[1:])
+        else:
+            raise EditError(f"Unexpected line in diff: {line[:80]!r}")
+    if not hunks:
+        raise EditError("The diff has no hunks (lines starting with @@)")
+    return hunks
+
+
+def _find_block(lines, block, expected, start):
+    """Index where block occurs in lines, preferring the one nearest expected."""
+    if not block:
+        return min(max(expected, start), len(lines))
+    for normalize in (lambda line: line, str.rstrip):
+        wanted = [normalize(line) for line in block]
+        first = wanted[0]
+        found = [i for i in range(start, len(lines) - len(block) + 1)
+                 if normalize(lines[i]) == first and [normalize(line) for line in lines[i:i + len(block)]] == wanted]
+        if found:
+            return min(found, key=lambda i: abs(i - expected))
+    return None
+
+
+def apply_diff(text, diff):
+    """Apply a unified diff to text; hunks may have drifted from their stated line numbers."""
+    lines = text.split("\n")
+    changes = []
+    offset = 0
+    position = 0
+    for number, (old_start, old_lines, new_lines) in enumerate(parse_unified_diff(diff), 1):
+        # A pure insertion ("@@ -5,0 ...") goes after its stated line rather than at it
+        expected = (old_start if not old_lines else max(old_start - 1, 0)) + offset
+        at = _find_block(lines, old_lines, expected, position)
+        if at is None:
+            raise EditError(f"Hunk {number} (@@ -{old_start}) does not match the file. Read the file again and "
+                            f"regenerate the diff")
+        lines[at:at + len(old_lines)] = new_lines
+        changes.append((at + 1, old_lines, new_lines))
+        offset += len(new_lines) - len(old_lines)
+        position = at + len(new_lines)
+    return "\n".join(lines), changes
+
+
+def atomic_write(path, data):
+    """Write bytes to a temporary file next to path, then rename it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _trim_context(line, old, new):
+    # Lines a hunk or search text carried along unchanged are left out of the summary
+    while old and new and old[0] == new[0]:
+        old, new, line = old[1:], new[1:], line + 1
+    while old and new and old[-1] == new[-1]:
+        old, new = old[:-1], new[:-1]
+    return line, old, new
+
+
+def summarize_changes(path, changes):
+    changes = [_trim_context(*change) for change in changes]
+    added = sum(len(new) for _, old, new in changes)
+    removed = sum(len(old) for _, old, new in changes)
+    lines = [f"Edited {path}: {len(changes)} change{'s' if len(changes) != 1 else ''}, +{added} -{removed} lines"]
+    shown = 0
+    for number, (line, old, new) in enumerate(changes):
+        if shown >= MAX_SUMMARY_LINES:
+            lines.append(f"[... {len(changes) - number} more changes not shown]")
+            break
+        lines.append(f"@@ line {line} @@")
+        for prefix, block in (("-", old), ("+", new)):
+            for text in block:
+                if shown >= MAX_SUMMARY_LINES:
+                    break
+                lines.append(f"{prefix}{text}")
+                shown += 1
+    return "\n".join(lines)
+
+
+def edit_file(path, edits=None, diff=None):
+    """Apply search/replace edits or a unified diff to path and return a summary."""
+    if bool(edits) == bool(diff):
+        raise EditError("Pass either edits or diff")
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        encoding, text = "utf-8", raw.decode("utf-8")
+    except UnicodeDecodeError:
+        encoding, text = "iso-8859-1", raw.decode("iso-8859-1")
+    # Edits are written with \n; a CRLF file is matched as LF and converted back when saved
+    crlf = "\r\n" in text
+    if crlf:
+        text = text.replace("\r\n", "\n")
+
+    if edits:
+        new_text, changes = apply_replacements(text, edits)
+    else:
+        new_text, changes = apply_diff(text, diff)
+    if new_text == text:
+        return f"No changes to {path}: the edits leave the file as it was"
+    if crlf:
+        new_text = new_text.replace("\n", "\r\n")
+    atomic_write(path, new_text.encode(encoding))
+    return summarize_changes(path, changes)
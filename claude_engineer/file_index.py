@@ -0,0 +1,402 @@
+import fnmatch
+import itertools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Listings stop adding entries once they reach about this many tokens
+LIST_TOKEN_BUDGET = 6000
+# A listing walks at most this many entries per token of budget; past that, counts and totals are partial
+WALK_ENTRIES_PER_TOKEN = 4
+CHARS_PER_TOKEN = 4
+# Always hidden unless include_ignored is set, .gitignore or not
+DEFAULT_IGNORES = [".git/", "node_modules/", "__pycache__/", ".venv/", "venv/", ".mypy_cache/",
+                   ".pytest_cache/", ".tox/", ".idea/", ".DS_Store", "*.pyc"]
+# A directory modified this close to when it was scanned may have changed again within the
+# same mtime tick, so its cached listing is not trusted (the same "racy" check git uses)
+RACY_NS = 2_000_000_000
+# Directory trees kept in memory; the least recently used one is dropped past this
+MAX_CACHED_INDEXES = 8
+
+
+class IgnoreRule:
+    """One .gitignore pattern, relative to the directory of the file it came from."""
+
+    __slots__ = ("base", "negate", "dir_only", "regex")
+
+    def __init__(self, pattern, base=""):
+        self.base = base
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A pattern with a slash (other than a trailing one) is anchored to its .gitignore's directory
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        body = _glob_to_regex(pattern)
+        self.regex = re.compile(("" if anchored else "(?:.*/)?") + body + "$")
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1:]
+        return self.regex.match(rel_path) is not None
+
+
+def _glob_to_regex(pattern):
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                out.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_ignore_file(path, base=""):
+    rules = []
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.rstrip("\n").rstrip()
+                if line and not line.startswith("#"):
+                    rules.append(IgnoreRule(line, base))
+    except OSError:
+        pass
+    return rules
+
+
+def is_ignored(rules, rel_path, is_dir):
+    ignored = False
+    for rule in rules:
+        if rule.negate == ignored and rule.matches(rel_path, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+_serials = itertools.count()
+
+
+class _Dir:
+    __slots__ = ("mtime_ns", "scanned_ns", "files", "dirs", "rules", "ignore_mtime_ns", "serial", "visible")
+
+    def __init__(self, mtime_ns, scanned_ns, files, dirs, rules, ignore_mtime_ns):
+        self.mtime_ns = mtime_ns
+        self.scanned_ns = scanned_ns
+        self.files = files
+        self.dirs = dirs
+        self.rules = rules
+        self.ignore_mtime_ns = ignore_mtime_ns
+        # Identifies this scan, so filtered results computed from its rules can be reused
+        self.serial = next(_serials)
+        self.visible = None
+
+
+class FileIndex:
+    """In-memory listing of a directory tree, refreshed incrementally.
+
+    Each directory's entries (with file sizes and mtimes) are cached along
+    with the directory's own mtime. A refresh only rescans directories whose
+    mtime changed, so walking an unchanged tree costs one stat per
+    directory. Editing a file in place does not touch its directory's
+    mtime; call invalidate() after writing one.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._dirs = {}
+        self._lock = threading.Lock()
+
+    def _abs(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def scan(self, rel):
+        """Return the (possibly cached) _Dir for rel, or None if it is not a directory."""
+        path = self._abs(rel)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._dirs.pop(rel, None)
+            return None
+        cached = self._dirs.get(rel)
+        if cached is not None and cached.mtime_ns == st.st_mtime_ns and cached.scanned_ns - st.st_mtime_ns > RACY_NS:
+            if cached.ignore_mtime_ns is None:
+                return cached
+            ignore_path = os.path.join(path, ".gitignore")
+            try:
+                if os.stat(ignore_path).st_mtime_ns == cached.ignore_mtime_ns:
+                    return cached
+            except OSError:
+                pass
+
+        files = {}
+        dirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.name)
+                        else:
+                            entry_stat = entry.stat()
+                            files[entry.name] = (entry_stat.st_size, entry_stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        rules = []
+        ignore_mtime_ns = None
+        if ".gitignore" in files:
+            ignore_path = os.path.join(path, ".gitignore")
+            rules = parse_ignore_file(ignore_path, rel)
+            try:
+                ignore_mtime_ns = os.stat(ignore_path).st_mtime_ns
+            except OSError:
+                pass
+        scanned = _Dir(st.st_mtime_ns, time.time_ns(), files, sorted(dirs), rules, ignore_mtime_ns)
+        self._dirs[rel] = scanned
+        return scanned
+
+    def invalidate(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel.startswith(".."):
+            return
+        rel = "" if rel == "." else rel.replace(os.sep, "/")
+        with self._lock:
+            self._dirs.pop(rel, None)
+            self._dirs.pop(os.path.dirname(rel), None)
+
+    def rules_for(self, rel):
+        """Ignore rules in effect inside directory rel, from the root down, and a key identifying them."""
+        rules = [IgnoreRule(pattern) for pattern in DEFAULT_IGNORES]
+        key = ()
+        parts = rel.split("/") if rel else []
+        for i in range(len(parts) + 1):
+            scanned = self.scan("/".join(parts[:i]))
+            if scanned is not None and scanned.rules:
+                rules.extend(scanned.rules)
+                key += (scanned.serial,)
+        return rules, key
+
+    def _visible(self, scanned, dir_rel, rules, key, include_ignored):
+        # Matching every entry against the ignore rules is the slow part of a walk, so the
+        # filtered listing is kept until the directory or any .gitignore above it changes
+        key = (key, include_ignored)
+        if scanned.visible is not None and scanned.visible[0] == key:
+            return scanned.visible[1:]
+        prefix = f"{dir_rel}/" if dir_rel else ""
+        dirs = []
+        files = []
+        ignored = 0
+        for name in scanned.dirs:
+            if not include_ignored and is_ignored(rules, prefix + name, True):
+                ignored += 1
+            else:
+                dirs.append(name)
+        for name, (size, mtime_ns) in scanned.files.items():
+            if not include_ignored and is_ignored(rules, prefix + name, False):
+                ignored += 1
+            else:
+                files.append((name, size, mtime_ns))
+        scanned.visible = (key, dirs, files, ignored)
+        return dirs, files, ignored
+
+    def walk(self, rel="", max_depth=None, include_ignored=False, max_entries=None):
+        """Return [(rel path, depth, is_dir, size, mtime_ns)] for the tree under rel, and the ignored count.
+
+        The walk is breadth first. With max_entries, it stops once it has
+        collected more than that many entries, so a cut walk still covers
+        the top of the tree.
+        """
+        with self._lock:
+            entries = []
+            ignored = 0
+            rules, key = self.rules_for(rel)
+            pending = deque([(rel, 0, rules, key)])
+            while pending:
+                dir_rel, depth, rules, key = pending.popleft()
+                scanned = self.scan(dir_rel)
+                if scanned is None:
+                    continue
+                if dir_rel != rel and scanned.rules:
+                    rules = rules + scanned.rules
+                    key += (scanned.serial,)
+                dirs, files, dir_ignored = self._visible(scanned, dir_rel, rules, key, include_ignored)
+                ignored += dir_ignored
+                prefix = f"{dir_rel}/" if dir_rel else ""
+                for name in dirs:
+                    entries.append((prefix + name, depth + 1, True, 0, 0))
+                    if max_depth is None or depth + 1 < max_depth:
+                        pending.append((prefix + name, depth + 1, rules, key))
+                for name, size, mtime_ns in files:
+                    entries.append((prefix + name, depth + 1, False, size, mtime_ns))
+                if max_entries is not None and len(entries) > max_entries:
+                    break
+            return entries, ignored
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def find_root(path):
+    """The nearest enclosing directory with a .git entry, or path itself."""
+    path = os.path.abspath(path)
+    current = path
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return path
+        current = parent
+
+
+def get_index(root):
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = FileIndex(root)
+        _indexes.move_to_end(root)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+        return index
+
+
+def notify_changed(path):
+    """Tell every index covering path that it was created, written or removed."""
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        indexes = [index for root, index in _indexes.items() if path == root or path.startswith(root + os.sep)]
+    for index in indexes:
+        index.invalidate(path)
+
+
+def _short_size(size):
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024 or unit == "G":
+            return f"{size}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def _parent(rel):
+    return rel.rsplit("/", 1)[0] if "/" in rel else ""
+
+
+def list_tree(path=".", depth=None, patterns=None, include_ignored=False, max_tokens=LIST_TOKEN_BUDGET):
+    """Render the tree under path, breadth first, until the token budget is used up."""
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        raise NotADirectoryError(f"Not a directory: {path}")
+    index = get_index(find_root(path))
+    rel = os.path.relpath(path, index.root)
+    rel = "" if rel == "." else rel.replace(os.sep, "/")
+    # Only the tree within depth, and at most max_entries of it, is walked; totals cover only what was walked
+    max_entries = max_tokens * WALK_ENTRIES_PER_TOKEN
+    entries, ignored = index.walk(rel, depth, include_ignored, max_entries)
+    cut_short = len(entries) > max_entries
+    prefix_len = len(rel) + 1 if rel else 0
+
+    if patterns:
+        def wanted(entry_rel):
+            local = entry_rel[prefix_len:]
+            name = local.rsplit("/", 1)[-1]
+            return any(fnmatch.fnmatch(local, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+        files = [entry for entry in entries if not entry[2] and wanted(entry[0])]
+        # Keep only the directories that lead to a matching file
+        keep_dirs = set()
+        for entry in files:
+            parent = _parent(entry[0])
+            while len(parent) > len(rel) and parent not in keep_dirs:
+                keep_dirs.add(parent)
+                parent = _parent(parent)
+        entries = [entry for entry in entries if entry[2] and entry[0] in keep_dirs] + files
+
+    # Per-directory totals, so a directory whose contents are cut still says what it holds
+    totals = {}
+    dir_entries = []
+    for entry in entries:
+        if entry[2]:
+            dir_entries.append(entry)
+            continue
+        parent = _parent(entry[0])
+        count, total = totals.get(parent, (0, 0))
+        totals[parent] = (count + 1, total + entry[3])
+    # Roll each directory's totals up into its parent, deepest directories first
+    for entry in sorted(dir_entries, key=lambda entry: -entry[1]):
+        count, total = totals.get(entry[0], (0, 0))
+        parent = _parent(entry[0])
+        parent_count, parent_total = totals.get(parent, (0, 0))
+        totals[parent] = (parent_count + count, parent_total + total)
+    file_count, total_size = totals.get(rel, (0, 0))
+    dir_count = len(dir_entries)
+
+    def line(entry):
+        entry_rel, entry_depth, is_dir, size, mtime_ns = entry
+        name = entry_rel.rsplit("/", 1)[-1]
+        indent = "  " * (entry_depth - 1)
+        if is_dir:
+            if cut_short or (depth is not None and entry_depth >= depth):
+                # Not walked, or not all of it, so its contents are unknown
+                return f"{indent}{name}/"
+            count, total = totals.get(entry_rel, (0, 0))
+            return f"{indent}{name}/  ({count} files, {_short_size(total)})"
+        return f"{indent}{name}  {_short_size(size)}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime_ns / 1e9))}"
+
+    # Shallow entries first, so a cut listing still shows the whole top of the tree
+    budget = max_tokens * CHARS_PER_TOKEN
+    shown = []
+    for entry in sorted(entries, key=lambda entry: (entry[1], entry[0])):
+        text = line(entry)
+        budget -= len(text) + 1
+        if budget < 0:
+            break
+        shown.append((entry[0].split("/"), text))
+    shown.sort(key=lambda item: item[0])
+
+    header = f"[Directory: {path} | {file_count} files, {dir_count} directories, {_short_size(total_size)}"
+    if depth is not None:
+        header += f" within depth {depth}"
+    if cut_short:
+        header = header.replace(" | ", " | at least ", 1) + f" | walk stopped after {max_entries} entries"
+    if ignored:
+        header += f" | {ignored} ignored entries hidden"
+    lines = [header + "]"] + [text for _, text in shown]
+    if len(shown) < len(entries):
+        lines.append(f"[... {len(entries) - len(shown)} more entries not shown. List a subdirectory, "
+                     "or pass depth or patterns to narrow the listing.]")
+    return "\n".join(lines)
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from .history import digest_messages
+from .session import Session, CONTINUATION_EXIT_PHRASE, MAX_CONTINUATION_ITERATIONS
+from .tools import written_paths
+from .utils import TOOL_COLOR, RESULT_COLOR, ERROR_COLOR
+
+# Characters of the parent conversation shared, read-only, with every goal's sub-session
+GOAL_CONTEXT_CHARS = 8000
+GOAL_PATTERN = re.compile(r"Goal (\d+): (.+)")
+# "(after Goal 1)", "(depends on goals 1 and 2)", "(requires 3)"
+DEPENDENCY_PATTERN = re.compile(r"\s*\((?:after|depends on|requires|needs)\b([^)]*)\)", re.IGNORECASE)
+
+GOAL_PROMPT = """You are working on one goal of a larger task. Other goals are handled by other workers at the same time.
+
+Summary of the conversation so far (for reference only):
+{context}
+
+The full plan:
+{plan}
+
+Your goal: Goal {number}: {text}
+
+Work only on this goal. Avoid changing files that other goals are responsible for. When your goal is done, say "{exit_phrase}"."""
+
+
+class Goal:
+    """One "Goal N:" line from an automode plan, and how running it went."""
+
+    def __init__(self, number, text, depends_on=()):
+        self.number = number
+        self.text = text
+        self.depends_on = tuple(depends_on)
+        self.status = "pending"
+        self.error = None
+        self.response = ""
+        self.iterations = 0
+        self.duration = 0.0
+        # Absolute path -> contents of the file right after this goal last wrote it
+        self.written = {}
+
+
+def parse_goals(response):
+    """Goals listed in a reply, with the dependencies marked by "(after Goal N)"."""
+    goals = {}
+    for match in GOAL_PATTERN.finditer(response):
+        number = int(match.group(1))
+        if number in goals:
+            continue
+        text = match.group(2).strip()
+        depends_on = set()
+        dependency = DEPENDENCY_PATTERN.search(text)
+        if dependency:
+            depends_on = {int(n) for n in re.findall(r"\d+", dependency.group(1))}
+            text = (text[:dependency.start()] + text[dependency.end():]).strip()
+        goals[number] = Goal(number, text, depends_on)
+    for goal in goals.values():
+        # Only earlier goals count, so the graph can never have a cycle
+        goal.depends_on = tuple(sorted(n for n in goal.depends_on if n in goals and n < goal.number))
+    return [goals[number] for number in sorted(goals)]
+
+
+class GoalSession(Session):
+    """Sub-session for one goal; records the files its tool calls write."""
+
+    def __init__(self, goal, *args, goal_scheduler=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.goal = goal
+        self.goal_scheduler = goal_scheduler
+        self.parallel_goals = 1
+
+    def claim_iteration(self):
+        return self.goal_scheduler is None or self.goal_scheduler.claim_iteration()
+
+    def execute_tool(self, tool_name, tool_args):
+        result = super().execute_tool(tool_name, tool_args)
+        # The write tools report failure as "Error ..."; the file on disk then is not this goal's
+        if str(result).startswith("Error"):
+            return result
+        for path in written_paths(tool_name, tool_args, self.cwd):
+            try:
+                with open(path, "rb") as f:
+                    self.goal.written[path] = f.read()
+            except OSError:
+                pass
+        return result
+
+
+class GoalScheduler:
+    """Runs a plan's goals as a dependency graph instead of one after another.
+
+    Each goal gets its own sub-session, seeded with a digest of the parent
+    conversation, and starts as soon as the goals it depends on are done
+    (up to max_parallel at once). Files written by two goals that did not
+    depend on each other are reported as conflicts; both versions are kept
+    so the parent session can merge them.
+
+    max_iterations is one budget shared by all the goals, so running them
+    side by side never takes more automode iterations than running them
+    one after another would have been allowed.
+    """
+
+    def __init__(self, parent, goals, max_parallel=2, max_iterations=MAX_CONTINUATION_ITERATIONS):
+        self.parent = parent
+        self.goals = sorted(goals, key=lambda goal: goal.number)
+        self.by_number = {goal.number: goal for goal in self.goals}
+        self.max_parallel = max(1, max_parallel)
+        self.max_iterations = max_iterations
+        self.iterations_used = 0
+        self.versions_dir = None
+
+    def claim_iteration(self):
+        # Sub-sessions all run on the engine loop, so this needs no lock
+        if self.iterations_used >= self.max_iterations:
+            return False
+        self.iterations_used += 1
+        return True
+
+    def make_session(self, goal):
+        parent = self.parent
+        return GoalSession(
+            goal, model=parent.model, max_tokens=parent.max_tokens, cwd=parent.cwd, client=parent.client,
+            # Replies from goals running side by side would interleave on the terminal
+            display=parent.display and self.max_parallel == 1,
+            stream=parent.stream, prompt_cache=parent.prompt_cache, telemetry=parent.telemetry,
+            scheduler=parent.scheduler, cassette=parent.cassette, routing=parent.routing,
+            output_budgets=parent.output_budgets, goal_scheduler=self
+        )
+
+    def goal_prompt(self, goal, context):
+        plan = "\n".join(f"Goal {other.number}: {other.text}" for other in self.goals)
+        return GOAL_PROMPT.format(context=context or "(nothing yet)", plan=plan, number=goal.number, text=goal.text,
+                                  exit_phrase=CONTINUATION_EXIT_PHRASE)
+
+    async def run_goal(self, goal, context, tasks, semaphore):
+        if goal.depends_on:
+            await asyncio.gather(*(tasks[number] for number in goal.depends_on))
+            unfinished = [number for number in goal.depends_on if self.by_number[number].status != "done"]
+            if unfinished:
+                goal.status = "skipped"
+                goal.error = f"Goal {unfinished[0]} did not finish"
+                self.parent.print(f"Skipping Goal {goal.number}: {goal.error}", ERROR_COLOR)
+                return
+        async with semaphore:
+            goal.status = "running"
+            self.parent.print(f"\nStarting Goal {goal.number}: {goal.text}", TOOL_COLOR)
+            session = self.make_session(goal)
+            start = time.perf_counter()
+            try:
+                goal.response, goal.iterations = await session.arun_automode(
+                    self.goal_prompt(goal, context), self.max_iterations
+                )
+                goal.error = session.last_error
+                out_of_iterations = self.iterations_used >= self.max_iterations
+                if not goal.error and out_of_iterations and CONTINUATION_EXIT_PHRASE not in goal.response:
+                    goal.error = "stopped at the automode iteration limit"
+            except Exception as e:
+                goal.error = str(e)
+            goal.status = "failed" if goal.error else "done"
+            goal.duration = time.perf_counter() - start
+            for key, value in session.usage.items():
+                self.parent.usage[key] = self.parent.usage.get(key, 0) + value
+        if goal.status == "done":
+            self.parent.print(f"Goal {goal.number} done in {goal.duration:.1f}s ({len(goal.written)} files written)",
+                              RESULT_COLOR)
+        else:
+            self.parent.print(f"Goal {goal.number} failed: {goal.error}", ERROR_COLOR)
+
+    async def run(self):
+        """Run every goal and return a report for the parent session."""
+        context = digest_messages(self.parent.history, max_chars=GOAL_CONTEXT_CHARS)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        tasks = {}
+        # Dependencies always point at earlier goals, so their tasks exist by the time they are awaited
+        for goal in self.goals:
+            tasks[goal.number] = asyncio.ensure_future(self.run_goal(goal, context, tasks, semaphore))
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        self.parent.print(f"Ran {len(self.goals)} goals in {time.perf_counter() - start:.1f}s "
+                          f"(up to {self.max_parallel} at a time)", TOOL_COLOR)
+        return self.report(self.conflicts())
+
+    def ancestors(self, goal):
+        found = set()
+        stack = list(goal.depends_on)
+        while stack:
+            number = stack.pop()
+            if number not in found:
+                found.add(number)
+                stack.extend(self.by_number[number].depends_on)
+        return found
+
+    def conflicts(self):
+        """Paths written by more than one goal, where neither goal waited for the other."""
+        writers = {}
+        for goal in self.goals:
+            for path in goal.written:
+                writers.setdefault(path, []).append(goal)
+        conflicts = {}
+        for path, goals in writers.items():
+            clashing = {
+                goal.number
+                for goal in goals
+                for other in goals
+                if other is not goal and other.number not in self.ancestors(goal) and goal.number not in self.ancestors(other)
+            }
+            if clashing:
+                conflicts[path] = sorted(clashing)
+        return conflicts
+
+    def save_versions(self, conflicts):
+        """Write each goal's version of a conflicting file under versions_dir; returns {(path, number): copy}."""
+        self.versions_dir = tempfile.mkdtemp(prefix="claude-engineer-goals-")
+        base = self.parent.cwd or os.getcwd()
+        copies = {}
+        for path, numbers in conflicts.items():
+            rel = os.path.relpath(path, base) if path.startswith(base + os.sep) else path.lstrip(os.sep)
+            for number in numbers:
+                copy = os.path.join(self.versions_dir, f"goal-{number}", rel)
+                os.makedirs(os.path.dirname(copy), exist_ok=True)
+                with open(copy, "wb") as f:
+                    f.write(self.by_number[number].written[path])
+                copies[(path, number)] = copy
+        return copies
+
+    def report(self, conflicts):
+        lines = ["The goals were worked on by separate workers. Results:"]
+        for goal in self.goals:
+            state = goal.status if not goal.error else f"{goal.status}: {goal.error}"
+            lines.append(f"- Goal {goal.number} ({state}): {goal.text}")
+            if goal.written:
+                lines.append("  Files written: " + ", ".join(sorted(goal.written)))
+        if conflicts:
+            copies = self.save_versions(conflicts)
+            lines.append("")
+            lines.append("Some files were written by more than one goal at the same time. The copy on disk is from "
+                         "whichever goal wrote it last. Each goal's version was saved; read them and merge the "
+                         "changes into the file:")
+            for path, numbers in sorted(conflicts.items()):
+                lines.append(f"- {path}")
+                lines.extend(f"  Goal {number}'s version: {copies[(path, number)]}" for number in numbers)
+        else:
+            lines.append("")
+            lines.append("No file was written by more than one goal.")
+        lines.append("Check that the pieces fit together, finish anything left undone, and then continue.")
+        return "\n".join(lines)
+
+    def cleanup(self):
+        if self.versions_dir:
+            shutil.rmtree(self.versions_dir, ignore_errors=True)
+            self.versions_dir = None
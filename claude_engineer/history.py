@@ -0,0 +1,270 @@
+import inspect
+import json
+import os
+
+# Rough conversion used for budgeting; the API bills roughly one token per 4 characters of English text
+CHARS_PER_TOKEN = 4
+# Images are resized to at most 1024x1024, which the API bills at about 1,400 tokens
+IMAGE_TOKENS = 1600
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CLAUDE_ENGINEER_HISTORY_BUDGET", "60000"))
+# Number of most recent turns that are never summarized
+KEEP_RECENT_TURNS = 2
+# Tool results longer than this are replaced by a stub once they are old
+STUB_MIN_CHARS = 500
+DIGEST_MAX_CHARS = 4000
+# Images are replaced by a text placeholder once they are this many user turns old
+IMAGE_MAX_TURNS = int(os.getenv("CLAUDE_ENGINEER_IMAGE_TURNS", "3"))
+SUMMARY_PREFIX = "[Summary of the earlier conversation]"
+
+
+def _text_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _block_tokens(block):
+    block_type = block.get("type")
+    if block_type == "text":
+        return _text_tokens(block["text"])
+    if block_type == "image":
+        return IMAGE_TOKENS
+    if block_type == "tool_use":
+        return _text_tokens(block["name"] + json.dumps(block.get("input", {})))
+    if block_type == "tool_result":
+        content = block.get("content", "")
+        if isinstance(content, str):
+            return _text_tokens(content)
+        return sum(_block_tokens(part) for part in content)
+    return _text_tokens(json.dumps(block, default=str))
+
+
+def count_message_tokens(message):
+    content = message.get("content")
+    if not content:
+        return 0
+    if isinstance(content, str):
+        return _text_tokens(content)
+    return sum(_block_tokens(block) for block in content)
+
+
+def _is_turn_start(message):
+    if message["role"] != "user":
+        return False
+    content = message["content"]
+    if isinstance(content, str):
+        return True
+    return not any(block.get("type") == "tool_result" for block in content)
+
+
+def _brief(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def digest_messages(messages, max_chars=DIGEST_MAX_CHARS):
+    lines = []
+    for message in messages:
+        content = message.get("content")
+        if not content:
+            continue
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        for block in content:
+            block_type = block.get("type")
+            if block_type == "text":
+                if block["text"].startswith(SUMMARY_PREFIX):
+                    lines.append(block["text"][len(SUMMARY_PREFIX):].strip())
+                else:
+                    lines.append(f"{message['role']}: {_brief(block['text'], 300)}")
+            elif block_type == "tool_use":
+                lines.append(f"assistant called {block['name']}({_brief(json.dumps(block.get('input', {})), 120)})")
+            elif block_type == "tool_result":
+                result = block.get("content", "")
+                if not isinstance(result, str):
+                    result = json.dumps(result, default=str)
+                lines.append(f"tool result: {_brief(result, 120)}")
+            elif block_type == "image":
+                lines.append(f"{message['role']}: [image]")
+    digest = "\n".join(lines)
+    if len(digest) > max_chars:
+        digest = "...\n" + digest[-max_chars:]
+    return digest
+
+
+def _stub_block(block):
+    if block.get("type") == "tool_result":
+        content = block.get("content", "")
+        size = len(content) if isinstance(content, str) else len(json.dumps(content, default=str))
+        if size < STUB_MIN_CHARS:
+            return block
+        return dict(block, content=f"[Earlier tool result of {size} characters removed to save context. Run the tool again if you need it.]")
+    if block.get("type") == "image":
+        return {"type": "text", "text": "[An earlier image was removed to save context.]"}
+    return block
+
+
+def _image_placeholder(reply):
+    if reply:
+        return f"[An earlier image was removed to save context. Your reply to it began: {_brief(reply, 400)}]"
+    return "[An earlier image was removed to save context.]"
+
+
+class ConversationHistory(list):
+    """Conversation messages kept under a token budget.
+
+    Old tool results and images are stubbed out first, then older turns are
+    folded into a summary. Trimming only ever cuts at the start of a user
+    turn, so tool_use/tool_result pairs always stay together.
+
+    If ``journal`` is set, every change is also recorded there (see
+    journal.Journal) so the history can be rebuilt after the process exits.
+    """
+
+    def __init__(self, messages=(), token_budget=DEFAULT_TOKEN_BUDGET, summarizer=None, image_max_turns=IMAGE_MAX_TURNS, journal=None):
+        super().__init__(messages)
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.image_max_turns = image_max_turns
+        self.journal = journal
+        self._token_counts = {}
+
+    def append(self, message):
+        super().append(message)
+        if self.journal:
+            self.journal.append(message)
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, end, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("ConversationHistory only supports contiguous slice assignment")
+            value = list(value)
+        else:
+            start = index + len(self) if index < 0 else index
+            end = start + 1
+        super().__setitem__(index, value)
+        if self.journal:
+            self.journal.replace(start, end, value if isinstance(index, slice) else [value])
+
+    def __delitem__(self, index):
+        if not isinstance(index, slice):
+            index = index + len(self) if index < 0 else index
+            index = slice(index, index + 1)
+        self[index] = []
+
+    def clear(self):
+        del self[:]
+
+    def message_tokens(self, message):
+        cached = self._token_counts.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        tokens = count_message_tokens(message)
+        self._token_counts[id(message)] = (message, tokens)
+        return tokens
+
+    def total_tokens(self):
+        return sum(self.message_tokens(message) for message in self)
+
+    def turn_starts(self):
+        return [i for i, message in enumerate(self) if _is_turn_start(message)]
+
+    def _keep_from(self):
+        turn_starts = self.turn_starts()
+        return turn_starts[-KEEP_RECENT_TURNS] if len(turn_starts) >= KEEP_RECENT_TURNS else 0
+
+    def fit_to_budget(self):
+        if self.total_tokens() <= self.token_budget:
+            return False
+        keep_from = self._keep_from()
+        self._stub(0, keep_from)
+        if self.total_tokens() > self.token_budget and keep_from > 0:
+            summary = None
+            if self.summarizer and not inspect.iscoroutinefunction(self.summarizer):
+                summary = self._call_summarizer(self.summarizer, keep_from)
+            self._replace_with_summary(keep_from, summary)
+        self._finish_fit()
+        return True
+
+    async def afit_to_budget(self):
+        if self.total_tokens() <= self.token_budget:
+            return False
+        keep_from = self._keep_from()
+        self._stub(0, keep_from)
+        if self.total_tokens() > self.token_budget and keep_from > 0:
+            summary = None
+            if self.summarizer:
+                summary = self._call_summarizer(self.summarizer, keep_from)
+                if inspect.isawaitable(summary):
+                    try:
+                        summary = await summary
+                    except Exception:
+                        summary = None
+            self._replace_with_summary(keep_from, summary)
+        self._finish_fit()
+        return True
+
+    def _finish_fit(self):
+        if self.total_tokens() > self.token_budget:
+            # The recent turns alone are over budget; keep only the latest round of tool results intact
+            self._stub(0, max(len(self) - 2, 0))
+        self._forget_stale_counts()
+
+    def expire_images(self):
+        turn_starts = self.turn_starts()
+        if not self.image_max_turns or len(turn_starts) <= self.image_max_turns:
+            return False
+        expired = False
+        for i in range(turn_starts[-self.image_max_turns]):
+            content = self[i].get("content")
+            if not isinstance(content, list) or not any(block.get("type") == "image" for block in content):
+                continue
+            placeholder = _image_placeholder(self._reply_after(i))
+            self[i] = dict(self[i], content=[
+                {"type": "text", "text": placeholder} if block.get("type") == "image" else block
+                for block in content
+            ])
+            expired = True
+        return expired
+
+    def _reply_after(self, index):
+        for message in self[index + 1:]:
+            if message["role"] != "assistant":
+                continue
+            content = message.get("content")
+            if isinstance(content, str):
+                return content
+            texts = [block["text"] for block in content or [] if block.get("type") == "text"]
+            if texts:
+                return "\n".join(texts)
+        return ""
+
+    def _stub(self, start, end):
+        for i in range(start, end):
+            content = self[i].get("content")
+            if isinstance(content, list):
+                stubbed = [_stub_block(block) for block in content]
+                if any(new is not old for new, old in zip(stubbed, content)):
+                    self[i] = dict(self[i], content=stubbed)
+
+    def _call_summarizer(self, summarizer, end):
+        try:
+            return summarizer(self[:end])
+        except Exception:
+            return None
+
+    def _replace_with_summary(self, end, summary):
+        if not summary:
+            summary = digest_messages(self[:end])
+        self[:end] = [
+            {"role": "user", "content": f"{SUMMARY_PREFIX}\n{summary}"},
+            {"role": "assistant", "content": "Understood. I will continue from this summary."}
+        ]
+
+    def _forget_stale_counts(self):
+        live = {id(message) for message in self}
+        self._token_counts = {key: value for key, value in self._token_counts.items() if key in live}
@@ -0,0 +1,124 @@
+import codecs
+import os
+import re
+from collections import OrderedDict
+from .cache import DiskCache
+
+# Force an extraction engine by name; by default the first installed engine in ENGINES is used
+HTML_ENGINE = os.getenv("CLAUDE_ENGINEER_HTML_ENGINE")
+SKIPPED_TAGS = ("script", "style", "template", "noscript")
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+_cache = DiskCache("html_text")
+
+
+def detect_encoding(raw):
+    for bom, encoding in _BOMS:
+        if raw.startswith(bom):
+            return encoding
+    match = _META_CHARSET.search(raw[:4096])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    try:
+        raw.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "iso-8859-1"
+
+
+def _join_lines(strings):
+    return "\n".join(text for text in (s.strip() for s in strings) if text)
+
+
+def _lxml_text(raw, encoding):
+    import lxml.etree
+    import lxml.html
+    if encoding == "utf-8-sig":
+        raw, encoding = raw[len(codecs.BOM_UTF8):], "utf-8"
+    parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True)
+    try:
+        root = lxml.html.document_fromstring(raw, parser=parser)
+    except lxml.etree.ParserError:
+        return ""
+    lxml.etree.strip_elements(root, *SKIPPED_TAGS, with_tail=False)
+    return _join_lines(root.itertext())
+
+
+def _html_parser_text(raw, encoding):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw.decode(encoding, errors="replace"), "html.parser")
+    for tag in soup(SKIPPED_TAGS):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+ENGINES = OrderedDict([
+    ("lxml", ("lxml.html", _lxml_text)),
+    ("html.parser", ("bs4", _html_parser_text)),
+])
+_available = None
+
+
+def register_engine(name, module, extract):
+    global _available
+    ENGINES[name] = (module, extract)
+    ENGINES.move_to_end(name, last=False)
+    _available = None
+
+
+def available_engines():
+    global _available
+    if _available is None:
+        names = []
+        for name, (module, _) in ENGINES.items():
+            try:
+                __import__(module)
+                names.append(name)
+            except ImportError:
+                continue
+        _available = names
+    return _available
+
+
+def get_engine(name=None):
+    name = name or HTML_ENGINE
+    if name:
+        return name, ENGINES[name][1]
+    for name in available_engines():
+        return name, ENGINES[name][1]
+    raise ImportError("No HTML parser is installed; install lxml or beautifulsoup4")
+
+
+def extract_text(raw, engine=None):
+    name, extract = get_engine(engine)
+    return extract(raw, detect_encoding(raw))
+
+
+def extract_file_text(path, raw=None, engine=None):
+    name, extract = get_engine(engine)
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}:{name}"
+    text = _cache.get(key)
+    if text is None:
+        if raw is None:
+            with open(path, "rb") as f:
+                raw = f.read()
+        text = extract(raw, detect_encoding(raw))
+        _cache.set(key, text)
+    return text
+
+
+def looks_like_html(raw, file_extension, html_extensions):
+    if file_extension.lower() in html_extensions:
+        return True
+    head = raw[:64].lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    return head.startswith(b"<!doctype html") or head.startswith(b"<html")
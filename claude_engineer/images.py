@@ -0,0 +1,74 @@
+import base64
+import hashlib
+import io
+import json
+import os
+from .cache import DiskCache
+
+# Largest encoded image (before base64) sent to the API
+IMAGE_BYTE_BUDGET = int(os.getenv("CLAUDE_ENGINEER_IMAGE_BYTES", "200000"))
+MAX_DIMENSION = 1024
+JPEG_QUALITIES = (85, 75, 65, 50, 40)
+# Formats the API accepts as-is
+MEDIA_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+    "WEBP": "image/webp",
+}
+
+_cache = DiskCache("images", max_entries=200)
+
+
+def _encode(img, image_format, **options):
+    buffer = io.BytesIO()
+    img.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def _fit_to_budget(img, source_format, byte_budget):
+    from PIL import Image
+
+    img.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.DEFAULT_STRATEGY)
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    while True:
+        # Screenshots and transparent images stay PNG if that fits; everything else is JPEG
+        if source_format == "PNG" or has_alpha:
+            data = _encode(img, "PNG", optimize=True)
+            if len(data) <= byte_budget:
+                return "PNG", data
+        rgb = img if img.mode == "RGB" else img.convert("RGB")
+        for quality in JPEG_QUALITIES:
+            data = _encode(rgb, "JPEG", quality=quality, optimize=True)
+            if len(data) <= byte_budget:
+                return "JPEG", data
+        if max(img.size) <= 64:
+            return "JPEG", data
+        img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)), Image.LANCZOS)
+
+
+def encode_image(image_path, byte_budget=IMAGE_BYTE_BUDGET):
+    """Return (media_type, base64 data) for an image, reusing cached encodings by content hash."""
+    from PIL import Image
+
+    with open(image_path, "rb") as f:
+        raw = f.read()
+    key = f"{hashlib.sha256(raw).hexdigest()}:{byte_budget}:{MAX_DIMENSION}"
+    cached = _cache.get(key)
+    if cached is not None:
+        entry = json.loads(cached)
+        return entry["media_type"], entry["data"]
+
+    with Image.open(io.BytesIO(raw)) as img:
+        source_format = img.format
+        fits = len(raw) <= byte_budget and max(img.size) <= MAX_DIMENSION
+        if source_format in MEDIA_TYPES and fits:
+            image_format, data = source_format, raw
+        else:
+            img.load()
+            image_format, data = _fit_to_budget(img.copy(), source_format, byte_budget)
+
+    media_type = MEDIA_TYPES[image_format]
+    encoded = base64.b64encode(data).decode("utf-8")
+    _cache.set(key, json.dumps({"media_type": media_type, "data": encoded}))
+    return media_type, encoded
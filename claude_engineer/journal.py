@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+SESSION_DIR = os.getenv(
+    "CLAUDE_ENGINEER_SESSION_DIR",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "claude-engineer", "sessions")
+)
+# Strings longer than this (tool results, file contents, image data) go to the blob store
+BLOB_MIN_CHARS = 2000
+BLOB_KEY = "$blob"
+
+
+class BlobStore:
+    """Content-addressed store: each distinct string is written once, named by its SHA-256."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, text):
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        with open(self._path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+
+def _new_session_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+class Journal:
+    """Append-only JSONL log of one session's history.
+
+    Each change to the history is one line, flushed as soon as it is made:
+    ``append`` adds a message and ``replace`` swaps the messages in
+    [start, end) (stubbing, image expiry and summaries). Replaying the lines
+    in order rebuilds the history without calling the API.
+    """
+
+    def __init__(self, session_id=None, session_dir=None):
+        self.session_dir = session_dir or SESSION_DIR
+        self.session_id = session_id or _new_session_id()
+        self.path = os.path.join(self.session_dir, f"{self.session_id}.jsonl")
+        self.blobs = BlobStore(os.path.join(self.session_dir, "blobs"))
+        self._file = None
+
+    def _write(self, record):
+        if self._file is None:
+            os.makedirs(self.session_dir, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def _pack(self, value):
+        if isinstance(value, str):
+            return {BLOB_KEY: self.blobs.put(value)} if len(value) > BLOB_MIN_CHARS else value
+        if isinstance(value, dict):
+            return {key: self._pack(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._pack(item) for item in value]
+        return value
+
+    def _unpack(self, value):
+        if isinstance(value, dict):
+            if len(value) == 1 and BLOB_KEY in value:
+                return self.blobs.get(value[BLOB_KEY])
+            return {key: self._unpack(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._unpack(item) for item in value]
+        return value
+
+    def start(self, **metadata):
+        self._write({"op": "start", "session": self.session_id, "time": time.time(), **metadata})
+
+    def append(self, message):
+        self._write({"op": "append", "message": self._pack(message)})
+
+    def replace(self, start, end, messages):
+        self._write({"op": "replace", "start": start, "end": end, "messages": self._pack(list(messages))})
+
+    def load(self):
+        """Replay the journal and return (metadata, messages)."""
+        metadata = {}
+        messages = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash can leave a partly written last line
+                    continue
+                op = record.get("op")
+                if op == "append":
+                    messages.append(self._unpack(record["message"]))
+                elif op == "replace":
+                    messages[record["start"]:record["end"]] = self._unpack(record["messages"])
+                elif op == "start":
+                    metadata.update(record)
+        return metadata, messages
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def list_sessions(session_dir=None):
+    """Session ids in the journal directory, oldest first."""
+    session_dir = session_dir or SESSION_DIR
+    try:
+        names = os.listdir(session_dir)
+    except FileNotFoundError:
+        return []
+    paths = [os.path.join(session_dir, name) for name in names if name.endswith(".jsonl")]
+    return [os.path.basename(path)[:-len(".jsonl")] for path in sorted(paths, key=os.path.getmtime)]
+
+
+def find_session(name, session_dir=None):
+    """Resolve a session id, "last", or a path to a journal file to a Journal."""
+    if name.endswith(".jsonl") and os.path.isfile(name):
+        return Journal(os.path.basename(name)[:-len(".jsonl")], os.path.dirname(os.path.abspath(name)))
+    sessions = list_sessions(session_dir)
+    if name == "last":
+        if not sessions:
+            raise FileNotFoundError("There are no saved sessions to resume")
+        return Journal(sessions[-1], session_dir)
+    matches = [session_id for session_id in sessions if session_id.startswith(name)]
+    if name in matches:
+        return Journal(name, session_dir)
+    if len(matches) != 1:
+        raise FileNotFoundError(f"No unique saved session matches '{name}'")
+    return Journal(matches[0], session_dir)
@@ -0,0 +1,77 @@
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+MAX_CACHED_INDEXES = 32
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class LineIndex:
+    """Byte offset of the start of every line in a file."""
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.size = key[1]
+        self.offsets = array("q", [0])
+        if self.size:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                find = mm.find
+                append = self.offsets.append
+                pos = find(b"\n")
+                while pos != -1:
+                    append(pos + 1)
+                    pos = find(b"\n", pos + 1)
+        # A trailing newline does not start another line
+        if len(self.offsets) > 1 and self.offsets[-1] == self.size:
+            self.offsets.pop()
+
+    @property
+    def line_count(self):
+        return len(self.offsets) if self.size else 0
+
+    def byte_range(self, start_line, end_line):
+        # Lines are 1-based and inclusive
+        start = self.offsets[start_line - 1]
+        end = self.offsets[end_line] if end_line < len(self.offsets) else self.size
+        return start, end
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_line_index(path):
+    path = os.path.abspath(path)
+    key = _file_key(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None and index.key == key:
+            _indexes.move_to_end(path)
+            return index
+    index = LineIndex(path, key)
+    with _indexes_lock:
+        _indexes[path] = index
+        _indexes.move_to_end(path)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def read_byte_range(path, start, end):
+    if end <= start:
+        return b""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[start:end]
+
+
+def decode(data):
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("iso-8859-1")
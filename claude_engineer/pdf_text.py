@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from .cache import DiskCache
+
+# Pages returned by a read that does not ask for a page range
+PDF_MAX_PAGES_PER_READ = 50
+# Pages extracted per unit of work; each finished chunk is cached right away
+PDF_CHUNK_PAGES = 10
+# Requests with at least this many uncached pages are extracted in worker processes
+PDF_WORKER_MIN_PAGES = 20
+PDF_MAX_WORKERS = min(4, os.cpu_count() or 1)
+# File digests remembered by (path, mtime, size); the least recently used is dropped past this
+MAX_CACHED_DIGESTS = 256
+
+_cache = DiskCache("pdf_text")
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def file_digest(path):
+    st = os.stat(path)
+    stat_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _digests_lock:
+        digest = _digests.get(stat_key)
+        if digest is not None:
+            _digests.move_to_end(stat_key)
+            return digest
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    digest = sha.hexdigest()
+    with _digests_lock:
+        _digests[stat_key] = digest
+        while len(_digests) > MAX_CACHED_DIGESTS:
+            _digests.popitem(last=False)
+    return digest
+
+
+def _extract_pages(path, page_numbers):
+    import PyPDF2
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[n].extract_text() or "" for n in page_numbers]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # Forking a process that runs the engine loop and tool threads can deadlock the child
+            _executor = ProcessPoolExecutor(max_workers=PDF_MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _page_key(digest, page_number):
+    return f"{digest}:{page_number}"
+
+
+def page_count(path, digest):
+    key = f"{digest}:page_count"
+    count = _cache.get(key)
+    if count is None:
+        import PyPDF2
+        count = str(len(PyPDF2.PdfReader(path).pages))
+        _cache.set(key, count)
+    return int(count)
+
+
+def _extracted_chunks(path, chunks, use_workers):
+    if use_workers:
+        try:
+            futures = [_get_executor().submit(_extract_pages, path, chunk) for chunk in chunks]
+        except Exception:
+            futures = None
+        if futures is not None:
+            for chunk, future in zip(chunks, futures):
+                try:
+                    yield chunk, future.result()
+                except Exception:
+                    yield chunk, _extract_pages(path, chunk)
+            return
+    import PyPDF2
+    reader = PyPDF2.PdfReader(path)
+    for chunk in chunks:
+        yield chunk, [reader.pages[n].extract_text() or "" for n in chunk]
+
+
+def iter_pdf_pages(path, first, last, digest=None):
+    """Yield (page number, text) for pages first..last (1-based), using the cache where possible."""
+    digest = digest or file_digest(path)
+    numbers = list(range(first - 1, last))
+    cached = _cache.get_many(_page_key(digest, n) for n in numbers)
+    missing = [n for n in numbers if _page_key(digest, n) not in cached]
+    chunks = [missing[i:i + PDF_CHUNK_PAGES] for i in range(0, len(missing), PDF_CHUNK_PAGES)]
+    extracted_chunks = _extracted_chunks(path, chunks, len(missing) >= PDF_WORKER_MIN_PAGES)
+
+    extracted = {}
+    for n in numbers:
+        key = _page_key(digest, n)
+        if key in cached:
+            yield n + 1, cached[key]
+            continue
+        while key not in extracted:
+            chunk, texts = next(extracted_chunks)
+            fresh = {_page_key(digest, m): text for m, text in zip(chunk, texts)}
+            _cache.set_many(fresh)
+            extracted.update(fresh)
+        yield n + 1, extracted.pop(key)
+
+
+def read_pdf(path, start_page=None, end_page=None):
+    digest = file_digest(path)
+    total = page_count(path, digest)
+    first = max(int(start_page or 1), 1)
+    last = min(int(end_page) if end_page is not None else first + PDF_MAX_PAGES_PER_READ - 1, total)
+    if first > last:
+        return f"PDF content detected ({total} pages). The requested pages are past the end of the document."
+
+    pages = [text for _, text in iter_pdf_pages(path, first, last, digest)]
+    text = "\n".join(pages)
+    result = f"PDF content detected. Extracted text (pages {first}-{last} of {total}):\n\n{text}"
+    if last < total:
+        result += f"\n[... {total - last} more pages. Use start_page/end_page to read further.]"
+    return result
@@ -0,0 +1,103 @@
+from colorama import Style
+from .terminal import writer
+from .utils import print_code, print_colored, CLAUDE_COLOR
+
+
+class StreamRenderer:
+    """Print prose as it arrives; highlight fenced code once the fence closes.
+
+    Each feed() reaches the terminal as a single write. With pager set,
+    very long code blocks open in the pager instead of scrolling past.
+    """
+
+    def __init__(self, prefix="\nClaude: ", color=CLAUDE_COLOR, pager=False):
+        self.prefix = prefix
+        self.color = color
+        self.pager = pager
+        self.started = False
+        self.in_code = False
+        self.language = ""
+        self.code_lines = []
+        self._line = ""
+        self._emitted = 0
+        self._open_line = False
+
+    def feed(self, text):
+        while text:
+            newline = text.find("\n")
+            if newline == -1:
+                self._line += text
+                self._flush_partial()
+                break
+            self._line += text[:newline + 1]
+            text = text[newline + 1:]
+            self._finish_line()
+        writer.flush()
+
+    def finish(self):
+        if self._line:
+            self._line += "\n"
+            self._finish_line()
+        if self.in_code:
+            self._render_code()
+        if self._open_line:
+            self._write("\n")
+        writer.flush()
+
+    def _write(self, text):
+        if not text:
+            return
+        if not self.started:
+            self.started = True
+            text = self.prefix + text
+        writer.write(f"{self.color}{text}{Style.RESET_ALL}")
+        self._open_line = not text.endswith("\n")
+
+    @staticmethod
+    def _could_be_fence(line):
+        head = line.lstrip(" ")[:3]
+        return "```".startswith(head)
+
+    def _flush_partial(self):
+        if self.in_code or self._could_be_fence(self._line):
+            return
+        self._write(self._line[self._emitted:])
+        self._emitted = len(self._line)
+
+    def _finish_line(self):
+        line, emitted = self._line, self._emitted
+        self._line, self._emitted = "", 0
+        stripped = line.strip()
+        if self.in_code:
+            if stripped == "```":
+                self._render_code()
+            else:
+                self.code_lines.append(line)
+        elif emitted == 0 and stripped.startswith("```"):
+            self.in_code = True
+            self.language = stripped[3:].strip()
+            self.code_lines = []
+        else:
+            self._write(line[emitted:])
+
+    def _render_code(self):
+        code = "".join(self.code_lines)
+        self.in_code = False
+        self.code_lines = []
+        if not self.started:
+            self._write("\n")
+        self._open_line = False
+        if self.language and code:
+            print_code(code, self.language, pager=self.pager)
+        elif code:
+            print_colored(f"Code:\n{code}", self.color)
+
+
+class NullRenderer:
+    """Renderer for headless sessions; discards everything."""
+
+    def feed(self, text):
+        pass
+
+    def finish(self):
+        pass
@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import deque
+
+# Model aliases accepted by --model and in routing policies
+CLAUDE_MODELS = {
+    "opus": "claude-3-opus-20240229",
+    "sonnet": "claude-3-5-sonnet-20240620",
+    "haiku": "claude-3-haiku-20240307"
+}
+DEFAULT_MODEL = "sonnet"
+# Largest max_tokens each model accepts
+MAX_OUTPUT_TOKENS = {
+    "claude-3-5-sonnet-20240620": 8192,
+    "claude-3-opus-20240229": 4096,
+    "claude-3-haiku-20240307": 4096
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+# Models that only go past DEFAULT_MAX_OUTPUT_TOKENS with a beta header
+OUTPUT_BETAS = {
+    "claude-3-5-sonnet-20240620": "max-tokens-3-5-sonnet-2024-07-15"
+}
+# Output budgets cover the largest of this many recent replies per route, with some headroom
+BUDGET_WINDOW = 20
+BUDGET_HEADROOM = 1.25
+
+# Kinds of request a session makes:
+#   plan           the first request of a turn, answering the user (or the automode prompt)
+#   tool_followup  a request sent back with tool results
+#   summary        folding old turns into a summary
+ROUTE_NAMES = ("plan", "tool_followup", "summary")
+# Switching models mid-turn also gives up the prompt cache (it is per model), so cheaper routing is opt-in
+ROUTING_POLICY = os.getenv("CLAUDE_ENGINEER_ROUTING", "quality")
+
+
+def resolve_model(name):
+    return CLAUDE_MODELS.get(name, name) if name else name
+
+
+def max_output_tokens(model):
+    return MAX_OUTPUT_TOKENS.get(model, DEFAULT_MAX_OUTPUT_TOKENS)
+
+
+def fit_output(request):
+    """request with max_tokens cut to its model's limit, plus the beta header a larger limit needs.
+
+    Applied when the request is sent, since an overload fallback can move
+    a request to a model with a smaller limit.
+    """
+    model = request.get("model")
+    fitted = dict(request, max_tokens=min(request["max_tokens"], max_output_tokens(model)))
+    if fitted["max_tokens"] > DEFAULT_MAX_OUTPUT_TOKENS and model in OUTPUT_BETAS:
+        fitted["extra_headers"] = {"anthropic-beta": OUTPUT_BETAS[model]}
+    return fitted
+
+
+class Route:
+    """Where one kind of request goes: a model (None means the session's model), its output budget and fallbacks."""
+
+    def __init__(self, model=None, max_tokens=None, fallbacks=()):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.fallbacks = tuple(fallbacks)
+
+    def describe(self, default_model):
+        model = resolve_model(self.model) or default_model
+        return f"{model}" + (f" (max_tokens {self.max_tokens})" if self.max_tokens else "")
+
+
+class RoutingPolicy:
+    """Maps each kind of request to a Route.
+
+    Requests of a kind the policy does not mention use the session's model
+    and max_tokens. When a model is overloaded, the route's fallbacks are
+    tried in order.
+    """
+
+    def __init__(self, name, routes):
+        self.name = name
+        self.routes = dict(routes)
+
+    def route(self, route_name):
+        return self.routes.get(route_name) or Route()
+
+    def describe(self, default_model):
+        return f"{self.name}: " + ", ".join(
+            f"{route_name} -> {self.route(route_name).describe(default_model)}" for route_name in ROUTE_NAMES
+        )
+
+
+POLICIES = {
+    # Every request goes to the session's model (the default)
+    "quality": RoutingPolicy("quality", {
+        "plan": Route(fallbacks=("opus",)),
+        "tool_followup": Route(fallbacks=("opus",)),
+        "summary": Route(fallbacks=("opus",))
+    }),
+    # Planning stays on the session's model; reading tool results and summarizing go to the fast model
+    "balanced": RoutingPolicy("balanced", {
+        "plan": Route(fallbacks=("opus",)),
+        "tool_followup": Route("haiku", max_tokens=4000, fallbacks=("sonnet",)),
+        "summary": Route("haiku", max_tokens=1000, fallbacks=("sonnet",))
+    }),
+    # Everything on the fast model
+    "fast": RoutingPolicy("fast", {
+        "plan": Route("haiku", max_tokens=4000, fallbacks=("sonnet",)),
+        "tool_followup": Route("haiku", max_tokens=4000, fallbacks=("sonnet",)),
+        "summary": Route("haiku", max_tokens=1000, fallbacks=("sonnet",))
+    })
+}
+
+
+def get_policy(spec=ROUTING_POLICY):
+    """A named policy, or a custom one such as "plan=sonnet,tool_followup=haiku:2000,summary=haiku".
+
+    Each custom entry is route=model[:max_tokens]; routes left out use the session's model.
+    """
+    if isinstance(spec, RoutingPolicy):
+        return spec
+    if spec in POLICIES:
+        return POLICIES[spec]
+    routes = {}
+    for entry in spec.split(","):
+        route_name, _, target = entry.strip().partition("=")
+        if route_name not in ROUTE_NAMES or not target:
+            raise ValueError(f"Unknown routing policy {spec!r}: use one of {', '.join(POLICIES)} "
+                             f"or route=model[:max_tokens] entries for {', '.join(ROUTE_NAMES)}")
+        model, _, max_tokens = target.partition(":")
+        routes[route_name] = Route(model, int(max_tokens) if max_tokens else None, fallbacks=("sonnet",))
+    return RoutingPolicy(spec, routes)
+
+
+class OutputBudgets:
+    """max_tokens per route, sized from the replies that route has produced.
+
+    A route starts at its configured budget. Once a reply needs more (it
+    was continued past max_tokens), the budget grows to cover it with
+    some headroom, up to the model's limit, and falls back as large
+    replies age out of the window.
+    """
+
+    def __init__(self, window=BUDGET_WINDOW):
+        self.window = window
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route_name, output_tokens):
+        with self._lock:
+            self.samples.setdefault(route_name, deque(maxlen=self.window)).append(output_tokens)
+
+    def budget(self, route_name, base, model):
+        with self._lock:
+            largest = max(self.samples.get(route_name) or [0])
+        return min(max_output_tokens(model), max(base, int(largest * BUDGET_HEADROOM)))
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+# Client-side budgets shared by every session in the process; 0 means no limit
+REQUESTS_PER_MINUTE = int(os.getenv("CLAUDE_ENGINEER_RPM", "0"))
+INPUT_TOKENS_PER_MINUTE = int(os.getenv("CLAUDE_ENGINEER_ITPM", "0"))
+MAX_RETRIES = int(os.getenv("CLAUDE_ENGINEER_MAX_RETRIES", "6"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+# Error types the API can also report inside an otherwise successful stream
+RETRY_ERROR_TYPES = {"rate_limit_error", "overloaded_error", "api_error"}
+
+_schedulers = weakref.WeakKeyDictionary()
+_schedulers_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Refills at rate_per_minute; a single take larger than the bucket waits for a full bucket."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait, from retry-after-ms or retry-after headers."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue
+    return None
+
+
+def is_retryable(error):
+    from anthropic import APIConnectionError
+
+    if isinstance(error, APIConnectionError):
+        return True
+    if getattr(error, "status_code", None) in RETRY_STATUSES:
+        return True
+    body = getattr(error, "body", None)
+    error_type = body.get("error", {}).get("type") if isinstance(body, dict) else None
+    return error_type in RETRY_ERROR_TYPES
+
+
+def is_overloaded(error):
+    """The model is overloaded (529), as opposed to this account being rate limited."""
+    if getattr(error, "status_code", None) == 529:
+        return True
+    body = getattr(error, "body", None)
+    return isinstance(body, dict) and body.get("error", {}).get("type") == "overloaded_error"
+
+
+def backoff_delay(attempt, error=None):
+    # Full jitter keeps sessions that failed together from retrying together;
+    # a server-provided retry-after is a floor, not a suggestion
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    server_delay = retry_after(error) if error is not None else None
+    if server_delay is not None:
+        delay = server_delay + random.uniform(0, BACKOFF_BASE)
+    return delay
+
+
+class RequestScheduler:
+    """Admits Messages API requests from every session on one event loop.
+
+    Requests wait their turn (first come, first served) for the shared
+    request and input-token budgets. Rate-limit and overload errors are
+    retried with jittered exponential backoff; a 429 pauses admission for
+    all sessions, since they share the same account limits.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, input_tokens_per_minute=INPUT_TOKENS_PER_MINUTE,
+                 max_retries=MAX_RETRIES):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.input_tokens = TokenBucket(input_tokens_per_minute) if input_tokens_per_minute else None
+        self.max_retries = max_retries
+        self.paused_until = 0.0
+        self._lock = None
+
+    async def acquire(self, tokens=0):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                wait = max(0.0, self.paused_until - time.monotonic())
+                if self.requests:
+                    wait = max(wait, self.requests.wait_time(1))
+                if self.input_tokens and tokens:
+                    wait = max(wait, self.input_tokens.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests:
+                self.requests.take(1)
+            if self.input_tokens and tokens:
+                self.input_tokens.take(tokens)
+
+    async def submit(self, send, tokens=0, can_retry=None, on_retry=None):
+        """Await send() once admitted, retrying transient API errors.
+
+        can_retry() is checked before each retry (e.g. to give up once a
+        streamed reply has been partly shown); on_retry(error, delay,
+        attempt) is called before sleeping.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(tokens)
+            try:
+                return await send()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e) or (can_retry and not can_retry()):
+                    raise
+                delay = backoff_delay(attempt, e)
+                if getattr(e, "status_code", None) == 429:
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                if on_retry:
+                    on_retry(e, delay, attempt + 1)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+def get_scheduler():
+    loop = asyncio.get_running_loop()
+    with _schedulers_lock:
+        scheduler = _schedulers.get(loop)
+        if scheduler is None:
+            scheduler = _schedulers[loop] = RequestScheduler()
+        return scheduler
@@ -0,0 +1,677 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from . import engine
+from .utils import print_colored, TOOL_COLOR, RESULT_COLOR
+from .render import StreamRenderer, NullRenderer
+from .terminal import collapse, collapse_input
+from .images import encode_image
+from .history import ConversationHistory, digest_messages, count_message_tokens, CHARS_PER_TOKEN
+from .prompts import system_prompt, SUMMARY_PROMPT
+from .tools import tools, execute_tool
+from .telemetry import Telemetry
+from .scheduler import get_scheduler, is_overloaded
+from .routing import (
+    get_policy, resolve_model, max_output_tokens, fit_output, OutputBudgets, ROUTING_POLICY, CLAUDE_MODELS, DEFAULT_MODEL
+)
+from .cassette import CassetteMiss
+
+CONTINUATION_EXIT_PHRASE = "AUTOMODE_COMPLETE"
+MAX_CONTINUATION_ITERATIONS = 25
+
+# Model and output budget used for chat requests
+MODEL = CLAUDE_MODELS[DEFAULT_MODEL]
+MAX_TOKENS = 4000
+
+# Times a reply cut off at max_tokens is continued before it is left as it is
+MAX_CONTINUATIONS = 3
+# A reply cut off inside a tool call is only regenerated if its budget can grow by at least this factor
+MIN_REGENERATE_GROWTH = 1.5
+TRUNCATED_TOOL_TEXT = ("\n[The reply reached the output limit before the {name} call was complete, so it was not run. "
+                       "Make the call again with less content, for example by splitting a large file across "
+                       "write_files or edit_file calls.]")
+
+# Maximum number of tool calls from one assistant turn that run concurrently
+MAX_TOOL_WORKERS = 8
+
+# Independent automode goals worked on at the same time, each in its own sub-session; 1 runs them in the main session
+PARALLEL_GOALS = int(os.getenv("CLAUDE_ENGINEER_PARALLEL_GOALS", "1"))
+
+# Stream replies token-by-token instead of waiting for the whole message
+STREAM_RESPONSES = os.getenv("CLAUDE_ENGINEER_STREAM", "1") != "0"
+
+# Opt-in prompt caching for the tools, system prompt and conversation prefix
+PROMPT_CACHE = os.getenv("CLAUDE_ENGINEER_PROMPT_CACHE", "0") == "1"
+CACHE_CONTROL = {"type": "ephemeral"}
+
+SUMMARY_INPUT_CHARS = 20000
+SUMMARY_MAX_TOKENS = 1000
+
+# Reply recorded for a turn the user interrupted
+INTERRUPTED_TEXT = "[Interrupted by the user]"
+CANCELLED_TOOL_RESULT = "Tool call cancelled by the user."
+# Reply recorded for a turn that was still running when a resumed session ended
+UNFINISHED_TEXT = "[The session ended before this reply was finished]"
+UNFINISHED_TOOL_RESULT = "Tool call did not finish before the session ended."
+
+# One async Anthropic client (and its connection pool) per event loop, shared by every session on it
+_clients = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+_tool_executor = None
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _clients.get(loop)
+        if client is None:
+            from anthropic import AsyncAnthropic
+            # Retries are left to the request scheduler, which shares backoff across sessions
+            client = _clients[loop] = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+        return client
+
+
+def get_tool_executor():
+    # Tools are blocking file system and network calls; they run in threads off the event loop
+    global _tool_executor
+    with _client_lock:
+        if _tool_executor is None:
+            _tool_executor = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="claude-engineer-tool")
+        return _tool_executor
+
+
+def _block_to_dict(block):
+    if block.type == "text":
+        return {"type": "text", "text": block.text}
+    if block.type == "tool_use":
+        return {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+    return block.model_dump()
+
+
+def _usage_to_dict(usage):
+    return {
+        "input_tokens": usage.input_tokens or 0,
+        "output_tokens": usage.output_tokens or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0
+    }
+
+
+class Session:
+    """One conversation: its history, model settings and working directory.
+
+    The a-prefixed methods are coroutines run on the engine loop; chat() and
+    run_automode() are blocking wrappers around them. Ctrl+C during a blocking
+    call cancels the in-flight request and leaves the history consistent.
+    """
+
+    def __init__(self, model=MODEL, max_tokens=MAX_TOKENS, cwd=None, client=None,
+                 display=True, stream=STREAM_RESPONSES, prompt_cache=PROMPT_CACHE, history=None, telemetry=None,
+                 scheduler=None, parallel_goals=PARALLEL_GOALS, cassette=None, routing=ROUTING_POLICY,
+                 output_budgets=None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.cwd = os.path.abspath(cwd) if cwd else None
+        self.client = client
+        self.display = display
+        self.stream = stream
+        self.prompt_cache = prompt_cache
+        self.automode = False
+        self.history = history if history is not None else ConversationHistory(summarizer=self.summarize_history)
+        self.usage = {}
+        self.telemetry = telemetry or Telemetry()
+        self.scheduler = scheduler
+        self.parallel_goals = parallel_goals
+        self.cassette = cassette
+        self.routing = get_policy(routing)
+        self.output_budgets = output_budgets or OutputBudgets()
+        self.continuing = False
+        self.last_error = None
+
+    def get_client(self):
+        return self.client or get_client()
+
+    def get_scheduler(self):
+        return self.scheduler or get_scheduler()
+
+    def print(self, text, color):
+        if self.display:
+            print_colored(text, color)
+
+    def system_status(self, current_iteration=None, max_iterations=None):
+        automode_status = "You are currently in automode." if self.automode else "You are not in automode."
+        iteration_info = ""
+        if current_iteration is not None and max_iterations is not None:
+            iteration_info = f"You are currently on iteration {current_iteration} out of {max_iterations} in automode."
+        return f"{automode_status} {iteration_info}".strip()
+
+    def system_prompt(self, current_iteration=None, max_iterations=None):
+        # The per-turn status goes after the static prompt so the static part stays cacheable
+        status = self.system_status(current_iteration, max_iterations)
+        if self.cwd:
+            status += f"\nRelative file paths are resolved against the project directory {self.cwd}."
+        if self.prompt_cache:
+            return [
+                {"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL},
+                {"type": "text", "text": status}
+            ]
+        return f"{system_prompt}\n{status}"
+
+    def request_tools(self):
+        if not self.prompt_cache:
+            return tools
+        return tools[:-1] + [dict(tools[-1], cache_control=CACHE_CONTROL)]
+
+    async def request_messages(self):
+        self.history.expire_images()
+        if await self.history.afit_to_budget():
+            self.print(f"Conversation history trimmed to about {self.history.total_tokens()} tokens.", TOOL_COLOR)
+        messages = [msg for msg in self.history if msg.get('content')]
+        if not self.prompt_cache or not messages:
+            return messages
+        # Mark the end of the history so the next request reads the whole prefix from cache
+        last = messages[-1]
+        content = last["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        content = content[:-1] + [dict(content[-1], cache_control=CACHE_CONTROL)]
+        return messages[:-1] + [dict(last, content=content)]
+
+    async def summarize_history(self, messages):
+        transcript = digest_messages(messages, max_chars=SUMMARY_INPUT_CHARS)
+        prompt = f"{SUMMARY_PROMPT}\n\n{transcript}"
+        request = self.routed_request("summary", default_max_tokens=SUMMARY_MAX_TOKENS,
+                                      messages=[{"role": "user", "content": prompt}])
+        recorded = self.cassette.load(request, self.cwd) if self.cassette else None
+        if recorded is not None:
+            return "".join(block["text"] for block in recorded["content"] if block["type"] == "text")
+        # An overload fallback changes request["model"]; the reply is recorded under the request as it was made
+        original = dict(request)
+        start = time.perf_counter()
+        response = await self.get_scheduler().submit(
+            lambda: self.get_client().messages.create(**request),
+            tokens=len(prompt) // CHARS_PER_TOKEN,
+            on_retry=self.retry_handler("summary", request)
+        )
+        usage = _usage_to_dict(response.usage)
+        self.telemetry.record_request(
+            request["model"], usage, response.stop_reason, time.perf_counter() - start, purpose="summary"
+        )
+        content = [_block_to_dict(block) for block in response.content]
+        self.record_to_cassette(original, {"content": content, "stop_reason": response.stop_reason, "usage": usage})
+        return "".join(block["text"] for block in content if block["type"] == "text")
+
+    def report_cache_usage(self, usage):
+        read = usage.get("cache_read_input_tokens", 0)
+        written = usage.get("cache_creation_input_tokens", 0)
+        uncached = usage.get("input_tokens", 0)
+        self.print(f"Prompt cache: {read} tokens read, {written} tokens written, {uncached} uncached input tokens", TOOL_COLOR)
+
+    def renderer(self):
+        if not self.display:
+            return NullRenderer()
+        # Paging would stall automode until someone closes the pager
+        if self.continuing:
+            return StreamRenderer(prefix="", pager=not self.automode)
+        return StreamRenderer(pager=not self.automode)
+
+    async def stream_message(self, content, **request):
+        # Blocks are appended to content as they arrive, so the caller keeps the partial reply on cancellation
+        renderer = self.renderer()
+        tool_json = {}
+        stop_reason = None
+        usage = {}
+        ttfb = None
+        start = time.perf_counter()
+        try:
+            stream = await self.get_client().messages.create(stream=True, **request)
+            async with stream:
+                async for event in stream:
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+                    if event.type == "message_start":
+                        usage.update(_usage_to_dict(event.message.usage))
+                    elif event.type == "content_block_start":
+                        block = event.content_block
+                        if block.type == "tool_use":
+                            tool_json[event.index] = ""
+                            content.append({"type": "tool_use", "id": block.id, "name": block.name, "input": {}})
+                        elif block.type == "text":
+                            content.append({"type": "text", "text": block.text})
+                            renderer.feed(block.text)
+                        else:
+                            content.append(_block_to_dict(block))
+                    elif event.type == "content_block_delta":
+                        delta = event.delta
+                        if delta.type == "text_delta":
+                            content[event.index]["text"] += delta.text
+                            renderer.feed(delta.text)
+                        elif delta.type == "input_json_delta":
+                            tool_json[event.index] += delta.partial_json
+                    elif event.type == "content_block_stop":
+                        if event.index in tool_json:
+                            raw_input = tool_json.pop(event.index)
+                            try:
+                                content[event.index]["input"] = json.loads(raw_input) if raw_input else {}
+                            except ValueError:
+                                # Input cut off by max_tokens; the call is never run (see complete_message)
+                                content[event.index]["input"] = {}
+                    elif event.type == "message_delta":
+                        stop_reason = event.delta.stop_reason
+                        usage["output_tokens"] = event.usage.output_tokens
+        finally:
+            renderer.finish()
+        return {"content": content, "stop_reason": stop_reason, "usage": usage, "ttfb": ttfb}
+
+    def routed_request(self, route_name, default_max_tokens=None, **request):
+        """Request arguments with the model and max_tokens the routing policy picks for this kind of request."""
+        route = self.routing.route(route_name)
+        request["model"] = resolve_model(route.model) or self.model
+        base = route.max_tokens or default_max_tokens or self.max_tokens
+        request["max_tokens"] = self.output_budgets.budget(route_name, base, request["model"])
+        return request
+
+    def retry_handler(self, route_name, request):
+        """on_retry callback that also moves request to the route's next fallback model when its model is overloaded."""
+        fallbacks = []
+        for name in self.routing.route(route_name).fallbacks + (self.model,):
+            model = resolve_model(name)
+            if model != request["model"] and model not in fallbacks:
+                fallbacks.append(model)
+
+        def on_retry(error, delay, attempt):
+            if fallbacks and is_overloaded(error):
+                previous, request["model"] = request["model"], fallbacks.pop(0)
+                self.print(f"{previous} is overloaded; retrying with {request['model']}", TOOL_COLOR)
+            self.report_retry(error, delay, attempt)
+        return on_retry
+
+    def report_retry(self, error, delay, attempt):
+        reason = getattr(error, "status_code", None) or type(error).__name__
+        self.telemetry.record_retry(reason)
+        self.print(f"API unavailable ({reason}); retrying in {delay:.1f}s (attempt {attempt})", TOOL_COLOR)
+
+    def estimate_request_tokens(self, request):
+        system = request.get("system", "")
+        tokens = sum(count_message_tokens(message) for message in request.get("messages", []))
+        return tokens + len(json.dumps(system) + json.dumps(request.get("tools", []))) // CHARS_PER_TOKEN
+
+    def replay_message(self, content, request, regeneration=0):
+        """The cassette's recorded reply to request, shown as if it had just arrived; None if it must be sent."""
+        start = time.perf_counter()
+        recorded = self.cassette.load(request, self.cwd, regeneration)
+        if recorded is None:
+            return None
+        content.extend(recorded["content"])
+        renderer = self.renderer()
+        for block in content:
+            if block["type"] == "text":
+                renderer.feed(block["text"])
+        renderer.finish()
+        # Nothing was billed, so the recorded usage is not counted again
+        return {"content": content, "stop_reason": recorded["stop_reason"], "usage": {},
+                "latency": time.perf_counter() - start}
+
+    def record_to_cassette(self, request, response, regeneration=0):
+        if self.cassette is None:
+            return
+        try:
+            self.cassette.save(request, response, self.cwd, regeneration)
+        except OSError as e:
+            self.print(f"Could not record to cassette: {str(e)}", TOOL_COLOR)
+
+    async def create_message(self, content, route="plan", regeneration=0, **request):
+        """Send one request through the scheduler, recording its tokens and latency; returns the normalized reply.
+
+        route names the kind of request for fallbacks and telemetry. With a
+        cassette, a recorded reply is served from disk instead, and new
+        replies are recorded. regeneration counts how many times
+        complete_message has sent this request again with a larger budget.
+        """
+        if self.cassette is not None:
+            try:
+                response = self.replay_message(content, request, regeneration)
+            except CassetteMiss:
+                self.telemetry.record_error()
+                raise
+            if response is not None:
+                self.telemetry.record_request(
+                    request.get("model"), response["usage"], response["stop_reason"], response["latency"], purpose="replay"
+                )
+                return response
+
+        # An overload fallback changes request["model"]; the reply is recorded under the request as it was made
+        original = dict(request)
+
+        async def send():
+            start = time.perf_counter()
+            response = await self._create_message(content, **request)
+            response["latency"] = time.perf_counter() - start
+            return response
+
+        try:
+            response = await self.get_scheduler().submit(
+                send,
+                tokens=self.estimate_request_tokens(request),
+                # Once part of a streamed reply has been shown, retrying would show it twice
+                can_retry=lambda: not content,
+                on_retry=self.retry_handler(route, request)
+            )
+        except Exception:
+            self.telemetry.record_error()
+            raise
+        self.telemetry.record_request(
+            request.get("model"), response["usage"], response["stop_reason"], response["latency"], response.get("ttfb"),
+            purpose=route
+        )
+        self.record_to_cassette(original, response, regeneration)
+        return response
+
+    async def _create_message(self, content, **request):
+        request = fit_output(request)
+        if self.stream:
+            return await self.stream_message(content, **request)
+        response = await self.get_client().messages.create(**request)
+        content.extend(_block_to_dict(block) for block in response.content)
+        for block in content:
+            if block["type"] == "text":
+                renderer = self.renderer()
+                renderer.feed(block["text"])
+                renderer.finish()
+        return {"content": content, "stop_reason": response.stop_reason, "usage": _usage_to_dict(response.usage)}
+
+    async def complete_message(self, content, route, request):
+        """create_message, continuing a reply that stops at max_tokens.
+
+        Cut-off text is continued by sending the reply so far as an
+        assistant prefill and appending what comes back. A tool call cannot
+        be prefilled, so a reply cut off inside one is regenerated from the
+        text before it with a larger budget. A tool call that is still
+        incomplete after that is replaced by a note and never run.
+        """
+        response = await self.create_message(content, route=route, **request)
+        usage = dict(response["usage"])
+        continuations = 0
+        regenerations = 0
+        while response["stop_reason"] == "max_tokens" and continuations < MAX_CONTINUATIONS:
+            first_tool = next((i for i, block in enumerate(content) if block["type"] == "tool_use"), None)
+            if first_tool is not None:
+                budget = min(request["max_tokens"] * 2, max_output_tokens(request["model"]))
+                # Regenerating the whole call for a few more tokens would only be cut off again
+                if budget < request["max_tokens"] * MIN_REGENERATE_GROWTH:
+                    break
+                del content[first_tool:]
+                request = dict(request, max_tokens=budget)
+                regenerations += 1
+            # The API rejects a prefill that ends in whitespace
+            while content and content[-1]["type"] == "text" and not content[-1]["text"].strip():
+                content.pop()
+            if content and content[-1]["type"] == "text":
+                content[-1]["text"] = content[-1]["text"].rstrip()
+            messages = request["messages"]
+            if content:
+                messages = messages + [{"role": "assistant", "content": [dict(block) for block in content]}]
+            continuations += 1
+            self.print(f"\n[Reply reached max_tokens; continuing ({continuations}/{MAX_CONTINUATIONS})]", TOOL_COLOR)
+            continuation = []
+            self.continuing = bool(content)
+            try:
+                response = await self.create_message(continuation, route=route, regeneration=regenerations,
+                                                     **dict(request, messages=messages))
+            finally:
+                self.continuing = False
+                if continuation and continuation[0]["type"] == "text" and content and content[-1]["type"] == "text":
+                    content[-1]["text"] += continuation.pop(0)["text"]
+                content.extend(continuation)
+            for key, value in response["usage"].items():
+                usage[key] = usage.get(key, 0) + value
+
+        if response["stop_reason"] == "max_tokens":
+            # Whatever tool calls are left were cut off; running one could write half a file
+            for i, block in enumerate(content):
+                if block["type"] == "tool_use":
+                    content[i] = {"type": "text", "text": TRUNCATED_TOOL_TEXT.format(name=block["name"])}
+                    self.print(content[i]["text"], TOOL_COLOR)
+        self.output_budgets.observe(route, usage.get("output_tokens", 0))
+        return dict(response, content=content, usage=usage)
+
+    def execute_tool(self, tool_name, tool_args):
+        self.print(f"Executing tool: {tool_name} with args: {collapse_input(tool_args)}", TOOL_COLOR)
+        start = time.perf_counter()
+        result = execute_tool(tool_name, tool_args, cwd=self.cwd)
+        self.telemetry.record_tool(tool_name, time.perf_counter() - start, len(str(result).encode("utf-8")))
+        # Only the display is shortened; the model gets the whole result
+        self.print(f"Tool execution result: {collapse(result)}", RESULT_COLOR)
+        return result
+
+    async def run_tools(self, tool_uses):
+        for tool_use in tool_uses:
+            self.print(f"\nTool Used: {tool_use['name']}", TOOL_COLOR)
+            self.print(f"Tool Input: {collapse_input(tool_use['input'])}", TOOL_COLOR)
+
+        loop = asyncio.get_running_loop()
+
+        async def run(tool_use):
+            try:
+                return await loop.run_in_executor(
+                    get_tool_executor(), self.execute_tool, tool_use["name"], tool_use["input"]
+                )
+            except Exception as e:
+                return f"Error executing tool {tool_use['name']}: {str(e)}"
+
+        # Tools are I/O-bound (file system, web search), so run them side by side
+        results = await asyncio.gather(*(run(tool_use) for tool_use in tool_uses))
+
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": tool_use["id"],
+                "content": result if isinstance(result, str) else str(result)
+            }
+            for tool_use, result in zip(tool_uses, results)
+        ]
+
+    def add_user_message(self, user_input, image_path=None):
+        if not image_path:
+            self.history.append({"role": "user", "content": user_input})
+            return
+
+        self.print(f"Processing image at path: {image_path}", TOOL_COLOR)
+        media_type, image_base64 = encode_image(image_path)
+        self.history.append({
+            "role": "user",
+            "content": [
+                {
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": media_type,
+                        "data": image_base64
+                    }
+                },
+                {
+                    "type": "text",
+                    "text": f"User input for image: {user_input}"
+                }
+            ]
+        })
+        self.print("Image message added to conversation history", TOOL_COLOR)
+
+    def chat(self, user_input, image_path=None, current_iteration=None, max_iterations=None):
+        return engine.run(self.achat(user_input, image_path, current_iteration, max_iterations))
+
+    def run_automode(self, user_input, max_iterations=MAX_CONTINUATION_ITERATIONS):
+        return engine.run(self.arun_automode(user_input, max_iterations))
+
+    async def achat(self, user_input, image_path=None, current_iteration=None, max_iterations=None):
+        self.last_error = None
+        try:
+            self.add_user_message(user_input, image_path)
+        except Exception as e:
+            self.last_error = str(e)
+            self.print(f"Error encoding image: {str(e)}", TOOL_COLOR)
+            apology = "I'm sorry, there was an error processing the image. Please try again."
+            self.print(apology, TOOL_COLOR)
+            return apology, False
+
+        assistant_response = ""
+        exit_continuation = False
+        tool_rounds = 0
+        turn_usage = {}
+
+        try:
+            while True:
+                partial = []
+                # The first request of a turn plans; requests carrying tool results only follow up on them
+                route = "tool_followup" if tool_rounds else "plan"
+                try:
+                    response = await self.complete_message(
+                        partial,
+                        route,
+                        self.routed_request(
+                            route,
+                            system=self.system_prompt(current_iteration, max_iterations),
+                            messages=await self.request_messages(),
+                            tools=self.request_tools(),
+                            tool_choice={"type": "auto"}
+                        )
+                    )
+                except asyncio.CancelledError:
+                    self.end_cancelled_turn(partial)
+                    raise
+                except Exception as e:
+                    self.last_error = str(e)
+                    if not tool_rounds:
+                        self.print(f"Error calling Claude API: {str(e)}", TOOL_COLOR)
+                        apology = "I'm sorry, there was an error communicating with the AI. Please try again."
+                        self.print(apology, TOOL_COLOR)
+                        return apology, False
+                    self.print(f"Error in tool response: {str(e)}", TOOL_COLOR)
+                    error_text = "I encountered an error while processing the tool result. Please try again."
+                    assistant_response += "\n" + error_text
+                    self.history.append({"role": "assistant", "content": error_text})
+                    break
+
+                for key, value in response["usage"].items():
+                    turn_usage[key] = turn_usage.get(key, 0) + value
+
+                content = [block for block in response["content"] if block["type"] != "text" or block["text"]]
+                self.history.append({"role": "assistant", "content": content})
+
+                for content_block in content:
+                    if content_block["type"] == "text":
+                        assistant_response += content_block["text"]
+                        if CONTINUATION_EXIT_PHRASE in content_block["text"]:
+                            exit_continuation = True
+
+                tool_uses = [block for block in content if block["type"] == "tool_use"]
+                if response["stop_reason"] != "tool_use" or not tool_uses:
+                    break
+
+                tool_rounds += 1
+                try:
+                    tool_results = await self.run_tools(tool_uses)
+                except asyncio.CancelledError:
+                    self.end_cancelled_turn()
+                    raise
+                self.history.append({"role": "user", "content": tool_results})
+        finally:
+            for key, value in turn_usage.items():
+                self.usage[key] = self.usage.get(key, 0) + value
+            try:
+                self.telemetry.flush()
+            except OSError as e:
+                self.print(f"Could not write telemetry: {str(e)}", TOOL_COLOR)
+        if self.prompt_cache and turn_usage:
+            self.report_cache_usage(turn_usage)
+
+        return assistant_response, exit_continuation
+
+    def claim_iteration(self):
+        """Whether automode may start another iteration; goal sub-sessions share their scheduler's budget."""
+        return True
+
+    async def arun_automode(self, user_input, max_iterations=MAX_CONTINUATION_ITERATIONS):
+        from .goals import GoalScheduler, parse_goals
+
+        self.automode = True
+        iteration_count = 0
+        response = ""
+        goal_scheduler = None
+        try:
+            while self.automode and iteration_count < max_iterations and self.claim_iteration():
+                response, exit_continuation = await self.achat(user_input, current_iteration=iteration_count + 1, max_iterations=max_iterations)
+
+                if exit_continuation or CONTINUATION_EXIT_PHRASE in response:
+                    self.print("Automode completed.", TOOL_COLOR)
+                    self.automode = False
+                else:
+                    self.print(f"Continuation iteration {iteration_count + 1} completed.", TOOL_COLOR)
+                    self.print("Press Ctrl+C to exit automode.", TOOL_COLOR)
+                    user_input = "Continue with the next step."
+                    # The first plan with several goals is handed to the goal scheduler; later ones run here as usual
+                    goals = parse_goals(response) if goal_scheduler is None and self.parallel_goals > 1 else []
+                    remaining = max_iterations - iteration_count - 1
+                    if len(goals) > 1 and remaining > 0:
+                        goal_scheduler = GoalScheduler(self, goals, self.parallel_goals, remaining)
+                        user_input = await goal_scheduler.run()
+                        # The goals' iterations come out of the same budget
+                        iteration_count += goal_scheduler.iterations_used
+
+                iteration_count += 1
+
+                if iteration_count >= max_iterations:
+                    self.print("Max iterations reached. Exiting automode.", TOOL_COLOR)
+                    self.automode = False
+        finally:
+            self.automode = False
+            if goal_scheduler is not None:
+                goal_scheduler.cleanup()
+        return response, iteration_count
+
+    def start_journal(self, journal):
+        """Record this session's history in an append-only journal from now on."""
+        journal.start(model=self.model, cwd=self.cwd)
+        self.history.journal = journal
+
+    def resume(self, journal):
+        """Rebuild the history from a journal and keep appending to it. Makes no API calls."""
+        _, messages = journal.load()
+        self.history.journal = None
+        self.history[:] = messages
+        self.history.journal = journal
+        journal.start(model=self.model, cwd=self.cwd, resumed=True)
+        # A crash can leave a turn half done; close it off the same way as a cancelled one
+        self.end_cancelled_turn(note=UNFINISHED_TEXT, tool_result=UNFINISHED_TOOL_RESULT)
+        return len(messages)
+
+    def end_cancelled_turn(self, partial_content=(), note=INTERRUPTED_TEXT, tool_result=CANCELLED_TOOL_RESULT):
+        """Leave a valid history after a turn is cancelled mid-request or mid-tool.
+
+        Text that was already streamed is kept; a tool_use without its result,
+        which the API would reject on the next request, gets a cancelled result.
+        """
+        text = "".join(block.get("text", "") for block in partial_content if block.get("type") == "text")
+        last = self.history[-1] if self.history else None
+        if last and last["role"] == "assistant" and isinstance(last["content"], list):
+            tool_uses = [block for block in last["content"] if block.get("type") == "tool_use"]
+            if tool_uses:
+                self.history.append({
+                    "role": "user",
+                    "content": [
+                        {"type": "tool_result", "tool_use_id": block["id"], "content": tool_result, "is_error": True}
+                        for block in tool_uses
+                    ]
+                })
+        if self.history and self.history[-1]["role"] == "user":
+            reply = f"{text}\n{note}" if text else note
+            self.history.append({"role": "assistant", "content": reply})
+
+    def end_interrupted_turn(self):
+        # Ensure the conversation history ends with an assistant message
+        if self.history and self.history[-1]["role"] == "user":
+            self.history.append({"role": "assistant", "content": "Automode interrupted. How can I assist you further?"})
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOOL_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+RESULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+# Per-request and per-tool-call records kept for the JSON export and /stats
+MAX_RECORDS = 1000
+METRIC_PREFIX = "claude_engineer"
+TOKEN_TYPES = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+# US dollars per million input and output tokens; cache writes cost 1.25x input, cache reads 0.1x
+MODEL_PRICES = {
+    "claude-3-5-sonnet-20240620": (3.0, 15.0),
+    "claude-3-opus-20240229": (15.0, 75.0),
+    "claude-3-sonnet-20240229": (3.0, 15.0),
+    "claude-3-haiku-20240307": (0.25, 1.25)
+}
+
+
+def request_cost(model, usage):
+    """Estimated price of one request in US dollars, or 0.0 for a model without a known price."""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (
+        usage.get("input_tokens", 0) * input_price
+        + usage.get("cache_creation_input_tokens", 0) * input_price * 1.25
+        + usage.get("cache_read_input_tokens", 0) * input_price * 0.1
+        + usage.get("output_tokens", 0) * output_price
+    ) / 1_000_000
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, as Prometheus expects them."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {("+Inf" if bound == float("inf") else str(bound)): total for bound, total in self.cumulative()}
+        }
+
+
+def _quantile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Telemetry:
+    """Token usage, request latency and tool timing for one session.
+
+    Running totals and histograms cover the whole session; the most recent
+    MAX_RECORDS requests and tool calls are also kept individually. Set
+    json_path and/or prometheus_path to have flush() write them out.
+    """
+
+    def __init__(self, json_path=None, prometheus_path=None):
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.started = time.time()
+        self.requests = deque(maxlen=MAX_RECORDS)
+        self.tool_calls = deque(maxlen=MAX_RECORDS)
+        self.tokens = {token_type: 0 for token_type in TOKEN_TYPES}
+        self.request_count = 0
+        self.error_count = 0
+        self.retries = {}
+        self.stop_reasons = {}
+        self.cost = 0.0
+        # purpose -> {"requests", "cost", "latency", "output_tokens", "models"}
+        self.routes = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.ttfb = Histogram(LATENCY_BUCKETS)
+        self.tool_duration = {}
+        self.tool_result_size = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, model, usage, stop_reason, latency, ttfb=None, purpose="chat"):
+        record = {
+            "time": time.time(),
+            "model": model,
+            "purpose": purpose,
+            "stop_reason": stop_reason,
+            "latency": latency,
+            "ttfb": ttfb if ttfb is not None else latency,
+            **{token_type: usage.get(token_type, 0) for token_type in TOKEN_TYPES}
+        }
+        record["cost"] = request_cost(model, record)
+        with self._lock:
+            self.requests.append(record)
+            self.request_count += 1
+            for token_type in TOKEN_TYPES:
+                self.tokens[token_type] += record[token_type]
+            self.cost += record["cost"]
+            route = self.routes.setdefault(
+                purpose, {"requests": 0, "cost": 0.0, "latency": Histogram(LATENCY_BUCKETS), "output_tokens": 0, "models": {}}
+            )
+            route["requests"] += 1
+            route["cost"] += record["cost"]
+            route["latency"].observe(latency)
+            route["output_tokens"] += record["output_tokens"]
+            route["models"][model] = route["models"].get(model, 0) + 1
+            self.stop_reasons[stop_reason] = self.stop_reasons.get(stop_reason, 0) + 1
+            self.latency.observe(latency)
+            self.ttfb.observe(record["ttfb"])
+
+    def record_error(self):
+        with self._lock:
+            self.error_count += 1
+
+    def record_retry(self, reason):
+        reason = str(reason)
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def record_tool(self, name, duration, result_size):
+        with self._lock:
+            self.tool_calls.append({"time": time.time(), "tool": name, "duration": duration, "result_size": result_size})
+            if name not in self.tool_duration:
+                self.tool_duration[name] = Histogram(TOOL_DURATION_BUCKETS)
+                self.tool_result_size[name] = Histogram(RESULT_SIZE_BUCKETS)
+            self.tool_duration[name].observe(duration)
+            self.tool_result_size[name].observe(result_size)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "requests": self.request_count,
+                "errors": self.error_count,
+                "retries": dict(self.retries),
+                "tokens": dict(self.tokens),
+                "stop_reasons": dict(self.stop_reasons),
+                "cost_usd": self.cost,
+                "routes": {
+                    purpose: dict(route, latency=route["latency"].to_dict(), models=dict(route["models"]))
+                    for purpose, route in self.routes.items()
+                },
+                "latency_seconds": self.latency.to_dict(),
+                "ttfb_seconds": self.ttfb.to_dict(),
+                "tools": {
+                    name: {
+                        "duration_seconds": self.tool_duration[name].to_dict(),
+                        "result_bytes": self.tool_result_size[name].to_dict()
+                    }
+                    for name in self.tool_duration
+                },
+                "recent_requests": list(self.requests),
+                "recent_tool_calls": list(self.tool_calls)
+            }
+
+    def prometheus_text(self):
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        def histogram(name, hist, labels=()):
+            for bound, total in hist.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{METRIC_PREFIX}_{name}_bucket{_labels(tuple(labels) + (('le', le),))} {total}")
+            lines.append(f"{METRIC_PREFIX}_{name}_sum{_labels(labels)} {hist.sum}")
+            lines.append(f"{METRIC_PREFIX}_{name}_count{_labels(labels)} {hist.count}")
+
+        with self._lock:
+            header("requests_total", "counter", "Messages API requests by stop reason.")
+            for stop_reason, count in self.stop_reasons.items():
+                lines.append(f"{METRIC_PREFIX}_requests_total{_labels([('stop_reason', stop_reason)])} {count}")
+            header("request_errors_total", "counter", "Messages API requests that failed.")
+            lines.append(f"{METRIC_PREFIX}_request_errors_total {self.error_count}")
+            header("request_retries_total", "counter", "Requests retried after a rate-limit, overload or connection error.")
+            for reason, count in self.retries.items():
+                lines.append(f"{METRIC_PREFIX}_request_retries_total{_labels([('reason', reason)])} {count}")
+            header("cost_usd_total", "counter", "Estimated spend in US dollars, by route.")
+            for purpose, route in self.routes.items():
+                lines.append(f"{METRIC_PREFIX}_cost_usd_total{_labels([('route', purpose)])} {route['cost']}")
+            header("route_latency_seconds", "histogram", "Request latency by route.")
+            for purpose, route in self.routes.items():
+                histogram("route_latency_seconds", route["latency"], [("route", purpose)])
+            header("tokens_total", "counter", "Tokens billed, by type.")
+            for token_type, count in self.tokens.items():
+                lines.append(f"{METRIC_PREFIX}_tokens_total{_labels([('type', token_type)])} {count}")
+            header("request_latency_seconds", "histogram", "Time from sending a request to the end of the reply.")
+            histogram("request_latency_seconds", self.latency)
+            header("request_ttfb_seconds", "histogram", "Time from sending a request to its first event.")
+            histogram("request_ttfb_seconds", self.ttfb)
+            header("tool_duration_seconds", "histogram", "Tool execution time.")
+            for name, hist in self.tool_duration.items():
+                histogram("tool_duration_seconds", hist, [("tool", name)])
+            header("tool_result_bytes", "histogram", "Size of tool results.")
+            for name, hist in self.tool_result_size.items():
+                histogram("tool_result_bytes", hist, [("tool", name)])
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        # Written to a temporary file and renamed so collectors never read a partial file
+        for path, render in ((self.json_path, lambda: json.dumps(self.to_dict(), indent=2)),
+                             (self.prometheus_path, self.prometheus_text)):
+            if not path:
+                continue
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(render())
+            os.replace(tmp_path, path)
+
+    def summary(self):
+        with self._lock:
+            requests = list(self.requests)
+            tool_calls = list(self.tool_calls)
+            tokens = dict(self.tokens)
+            request_count, error_count = self.request_count, self.error_count
+            retry_count = sum(self.retries.values())
+            cost = self.cost
+        prompt_tokens = tokens["input_tokens"] + tokens["cache_read_input_tokens"] + tokens["cache_creation_input_tokens"]
+        cache_share = tokens["cache_read_input_tokens"] / prompt_tokens * 100 if prompt_tokens else 0.0
+        lines = [
+            f"Requests: {request_count} ({error_count} failed, {retry_count} retries) over {(time.time() - self.started) / 60:.1f} minutes",
+            f"Tokens: {tokens['input_tokens']} input, {tokens['output_tokens']} output, "
+            f"{tokens['cache_read_input_tokens']} cache read, {tokens['cache_creation_input_tokens']} cache write "
+            f"({cache_share:.0f}% of prompt tokens from cache), about ${cost:.4f}"
+        ]
+        if requests:
+            latencies = [record["latency"] for record in requests]
+            ttfbs = [record["ttfb"] for record in requests]
+            lines.append(
+                f"Latency: p50 {_quantile(latencies, 0.5):.2f}s, p95 {_quantile(latencies, 0.95):.2f}s, "
+                f"total {sum(latencies):.1f}s; time to first byte p50 {_quantile(ttfbs, 0.5):.2f}s"
+            )
+        by_route = {}
+        for record in requests:
+            by_route.setdefault(record["purpose"], []).append(record)
+        for purpose, records in sorted(by_route.items()):
+            latencies = [record["latency"] for record in records]
+            models = sorted({record["model"] for record in records})
+            lines.append(
+                f"Route {purpose}: {len(records)} requests to {', '.join(models)}, p50 {_quantile(latencies, 0.5):.2f}s, "
+                f"p95 {_quantile(latencies, 0.95):.2f}s, ${sum(record['cost'] for record in records):.4f}"
+            )
+        by_tool = {}
+        for call in tool_calls:
+            by_tool.setdefault(call["tool"], []).append(call)
+        for name, calls in sorted(by_tool.items()):
+            durations = [call["duration"] for call in calls]
+            size = sum(call["result_size"] for call in calls)
+            lines.append(
+                f"Tool {name}: {len(calls)} calls, p50 {_quantile(durations, 0.5) * 1000:.0f} ms, "
+                f"p95 {_quantile(durations, 0.95) * 1000:.0f} ms, {size / 1024:.1f} KB of results"
+            )
+        return "\n".join(lines)
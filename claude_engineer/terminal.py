@@ -0,0 +1,147 @@
+import functools
+import os
+import subprocess
+import sys
+import threading
+from colorama import Style
+
+# Buffered output is written out once it grows past this many characters, even without a flush()
+WRITE_BUFFER_CHARS = 64 * 1024
+# Tool results and inputs are cut down to this much on screen; the model still gets the full text
+DISPLAY_MAX_LINES = 20
+DISPLAY_MAX_CHARS = 2000
+DISPLAY_INPUT_CHARS = 500
+# Code blocks longer than this go to the pager in interactive chat, or are collapsed otherwise
+PAGER_MIN_LINES = int(os.getenv("CLAUDE_ENGINEER_PAGER_LINES", "200"))
+PAGER_ENABLED = os.getenv("CLAUDE_ENGINEER_PAGER", "1") != "0"
+
+
+class TerminalWriter:
+    """One buffered writer for everything the CLI prints.
+
+    Writes collect in memory and reach the terminal on flush(), so a
+    message made of many pieces costs one write to the terminal. Output
+    goes to whatever sys.stdout is at flush time, so redirect_stdout
+    still works. Safe to use from the tool threads.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size >= WRITE_BUFFER_CHARS:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._parts:
+            return
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+writer = TerminalWriter()
+
+
+def print_colored(text, color):
+    writer.write(f"{color}{text}{Style.RESET_ALL}\n")
+    writer.flush()
+
+
+@functools.lru_cache(maxsize=64)
+def get_lexer(language):
+    """Pygments lexer for a fence language, or None if pygments does not know it."""
+    from pygments.lexers import get_lexer_by_name
+    import pygments.util
+
+    try:
+        return get_lexer_by_name(language, stripall=True)
+    except pygments.util.ClassNotFound:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _formatter():
+    from pygments.formatters import TerminalFormatter
+
+    return TerminalFormatter()
+
+
+def highlight_code(code, language):
+    from pygments import highlight
+
+    lexer = get_lexer(language)
+    if lexer is None:
+        return None
+    return highlight(code, lexer, _formatter())
+
+
+def can_page():
+    return PAGER_ENABLED and sys.stdin.isatty() and sys.stdout.isatty()
+
+
+def page(text):
+    """Show text in $PAGER (less by default); returns False if no pager could be run."""
+    writer.flush()
+    command = os.environ.get("PAGER") or "less -R"
+    try:
+        proc = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, errors="backslashreplace")
+    except OSError:
+        return False
+    try:
+        with proc.stdin as pipe:
+            pipe.write(text)
+    except OSError:
+        # Quitting the pager before the end closes the pipe
+        pass
+    proc.wait()
+    return proc.returncode != 127
+
+
+def collapse(text, max_lines=DISPLAY_MAX_LINES, max_chars=DISPLAY_MAX_CHARS):
+    """The start of text with a note about what was left out, for display only."""
+    text = str(text)
+    if len(text) <= max_chars and text.count("\n") < max_lines:
+        return text
+    shown = "\n".join(text[:max_chars].split("\n")[:max_lines])
+    hidden_lines = text.count("\n") - shown.count("\n")
+    hidden_chars = len(text) - len(shown)
+    return f"{shown}\n[... {hidden_lines} more lines, {hidden_chars} more characters not shown]"
+
+
+def collapse_input(tool_input):
+    return collapse(tool_input, max_lines=1, max_chars=DISPLAY_INPUT_CHARS)
+
+
+def print_code(code, language, fallback_color, pager=False):
+    lines = len(code.splitlines())
+    if lines > PAGER_MIN_LINES and pager and can_page():
+        highlighted = highlight_code(code, language)
+        writer.write(f"{fallback_color}[{lines} lines of {language} shown in the pager]{Style.RESET_ALL}\n")
+        if page(highlighted if highlighted is not None else code):
+            writer.flush()
+            return
+    note = None
+    if lines > PAGER_MIN_LINES:
+        code = "".join(code.splitlines(keepends=True)[:PAGER_MIN_LINES])
+        note = f"[... {lines - PAGER_MIN_LINES} more lines not shown]"
+    highlighted = highlight_code(code, language)
+    if highlighted is not None:
+        writer.write(highlighted + "\n")
+    else:
+        # The language is not recognized, so fall back to plain text
+        writer.write(f"{fallback_color}Code (language: {language}):\n{code}{Style.RESET_ALL}\n")
+    if note:
+        writer.write(f"{fallback_color}{note}{Style.RESET_ALL}\n")
+    writer.flush()
@@ -0,0 +1,327 @@
+import os
+from .utils import (
+    create_folder, create_file, write_files, write_to_file, edit_file, read_file, list_files, search_code, tavily_search
+)
+
+# Define the tools
+tools = [
+    {
+        "name": "create_folder",
+        "description": "Create a new folder at the specified path. Use this when you need to create a new directory in the project structure.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "The path where the folder should be created"
+                }
+            },
+            "required": ["path"]
+        }
+    },
+    {
+        "name": "create_file",
+        "description": "Create a new file at the specified path with optional content. Use this when you need to create a new file in the project structure.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "The path where the file should be created"
+                },
+                "content": {
+                    "type": "string",
+                    "description": "The initial content of the file (optional)"
+                }
+            },
+            "required": ["path"]
+        }
+    },
+    {
+        "name": "write_files",
+        "description": "Create several folders and files in one call, for example to scaffold a whole project. Parent folders are created as needed, and existing files are replaced. It is all or nothing: if any file cannot be written, nothing is changed. Prefer this over one create_folder or create_file call per path.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "folders": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Folders to create, including empty ones (optional)"
+                },
+                "files": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "path": {
+                                "type": "string",
+                                "description": "The path of the file"
+                            },
+                            "content": {
+                                "type": "string",
+                                "description": "The content of the file"
+                            }
+                        },
+                        "required": ["path", "content"]
+                    },
+                    "description": "Files to write, with their full contents"
+                }
+            }
+        }
+    },
+    {
+        "name": "write_to_file",
+        "description": "Write content to an existing file at the specified path, replacing all of it. Use this when you need to rewrite most of an existing file; for smaller changes, edit_file is much faster.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "The path of the file to write to"
+                },
+                "content": {
+                    "type": "string",
+                    "description": "The content to write to the file"
+                }
+            },
+            "required": ["path", "content"]
+        }
+    },
+    {
+        "name": "edit_file",
+        "description": "Change part of an existing file without rewriting the whole of it. Pass either edits, a list of search/replace pairs, or diff, a unified diff. Each search text must be copied exactly from the file (including indentation) and match only one place; add surrounding lines to make it unique. All edits are checked before anything is written, and the file is only changed if they all apply. Returns a short summary of the changed lines.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "The path of the file to edit"
+                },
+                "edits": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "search": {
+                                "type": "string",
+                                "description": "Exact text to find in the file"
+                            },
+                            "replace": {
+                                "type": "string",
+                                "description": "Text to put in its place"
+                            },
+                            "replace_all": {
+                                "type": "boolean",
+                                "description": "Replace every occurrence instead of requiring exactly one (default: false)"
+                            }
+                        },
+                        "required": ["search", "replace"]
+                    },
+                    "description": "Search/replace edits, applied to the file as it is now"
+                },
+                "diff": {
+                    "type": "string",
+                    "description": "A unified diff of the file, with @@ hunk headers (use instead of edits)"
+                }
+            },
+            "required": ["path"]
+        }
+    },
+    {
+        "name": "read_file",
+        "description": "Read the contents of a file at the specified path. Use this when you need to examine the contents of an existing file. Large files are returned one page at a time with a header giving the total size; use the optional range parameters to read a specific part or the next page instead of the whole file.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "The path of the file to read"
+                },
+                "start_line": {
+                    "type": "integer",
+                    "description": "First line to read, 1-based (optional)"
+                },
+                "end_line": {
+                    "type": "integer",
+                    "description": "Last line to read, inclusive (optional)"
+                },
+                "head": {
+                    "type": "integer",
+                    "description": "Read only the first N lines (optional)"
+                },
+                "tail": {
+                    "type": "integer",
+                    "description": "Read only the last N lines (optional)"
+                },
+                "page": {
+                    "type": "integer",
+                    "description": "Page number to read, 1-based (optional)"
+                },
+                "page_size": {
+                    "type": "integer",
+                    "description": "Lines per page, default 500 (optional)"
+                },
+                "byte_offset": {
+                    "type": "integer",
+                    "description": "Byte offset to start reading at, for files without useful line breaks (optional)"
+                },
+                "byte_count": {
+                    "type": "integer",
+                    "description": "Number of bytes to read from byte_offset (optional)"
+                },
+                "start_page": {
+                    "type": "integer",
+                    "description": "For PDF files, the first page to extract, 1-based (optional)"
+                },
+                "end_page": {
+                    "type": "integer",
+                    "description": "For PDF files, the last page to extract, inclusive (optional)"
+                }
+            },
+            "required": ["path"]
+        }
+    },
+    {
+        "name": "list_files",
+        "description": "List the files and directories under a folder, recursively, with sizes and modification times. Entries ignored by .gitignore, plus .git, node_modules and similar, are hidden. One call shows a whole project: the top levels come first, and a long listing is cut off with a note. Then list a subdirectory, or pass depth or patterns, to see more.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "The path of the folder to list (default: current directory)"
+                },
+                "depth": {
+                    "type": "integer",
+                    "description": "How many levels to descend; 1 lists only the folder itself (default: no limit)"
+                },
+                "patterns": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Glob patterns such as '*.py' or 'src/**/test_*'; only matching files (and the folders containing them) are listed"
+                },
+                "include_ignored": {
+                    "type": "boolean",
+                    "description": "Also list ignored files and folders (default: false)"
+                }
+            }
+        }
+    },
+    {
+        "name": "search_code",
+        "description": "Search the project's code through an index and get back only the matching lines, with line numbers and a little context. Use this instead of reading whole files to find where something is defined or used. mode 'literal' (default) finds a string, 'regex' a Python regular expression, and 'symbol' the definitions of functions, classes and types with that exact name. The index follows .gitignore and updates itself when files change.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The text, regular expression or symbol name to search for"
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["literal", "regex", "symbol"],
+                    "description": "How to interpret the query (default: literal)"
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Only search under this folder (default: current directory)"
+                },
+                "glob": {
+                    "type": "string",
+                    "description": "Only search files matching this pattern, such as '*.py'"
+                },
+                "case_sensitive": {
+                    "type": "boolean",
+                    "description": "Match case exactly (default: false)"
+                },
+                "context": {
+                    "type": "integer",
+                    "description": "Lines of context around each match (default: 1)"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of matching lines to return (default: 50)"
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "tavily_search",
+        "description": "Perform a web search using Tavily API to get up-to-date information or additional context. Use this when you need current information or feel a search could provide a better answer. To research several things at once, pass a list of queries; they run concurrently. Recent results are cached, so repeating a query is free.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query"
+                },
+                "queries": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Several search queries to run concurrently (use instead of query)"
+                }
+            }
+        }
+    }
+]
+
+READ_RANGE_ARGS = ("start_line", "end_line", "head", "tail", "page", "page_size", "byte_offset", "byte_count", "start_page", "end_page")
+
+def resolve_path(path, cwd=None):
+    if cwd is None or os.path.isabs(path):
+        return path
+    return os.path.join(cwd, path)
+
+def written_paths(tool_name, tool_args, cwd=None):
+    """Absolute paths of the files a tool call writes (folders are not included)."""
+    if tool_name in ("create_file", "write_to_file", "edit_file") and tool_args.get("path"):
+        paths = [tool_args["path"]]
+    elif tool_name == "write_files":
+        paths = [entry["path"] for entry in tool_args.get("files") or () if entry.get("path")]
+    else:
+        paths = []
+    return [os.path.abspath(resolve_path(path, cwd)) for path in paths]
+
+def execute_tool(tool_name, tool_args, cwd=None):
+    if tool_name == "create_folder":
+        result = create_folder(resolve_path(tool_args["path"], cwd))
+    elif tool_name == "create_file":
+        result = create_file(resolve_path(tool_args["path"], cwd), tool_args.get("content", ""))
+    elif tool_name == "write_files":
+        result = write_files(
+            [resolve_path(folder, cwd) for folder in tool_args.get("folders") or ()],
+            [{**entry, "path": resolve_path(entry["path"], cwd)} for entry in tool_args.get("files") or ()]
+        )
+    elif tool_name == "write_to_file":
+        result = write_to_file(resolve_path(tool_args["path"], cwd), tool_args["content"])
+    elif tool_name == "edit_file":
+        result = edit_file(resolve_path(tool_args["path"], cwd), edits=tool_args.get("edits"), diff=tool_args.get("diff"))
+    elif tool_name == "read_file":
+        range_args = {key: tool_args[key] for key in READ_RANGE_ARGS if tool_args.get(key) is not None}
+        result = read_file(resolve_path(tool_args["path"], cwd), **range_args)
+    elif tool_name == "list_files":
+        result = list_files(
+            resolve_path(tool_args.get("path", "."), cwd),
+            depth=tool_args.get("depth"),
+            patterns=tool_args.get("patterns"),
+            include_ignored=tool_args.get("include_ignored", False)
+        )
+    elif tool_name == "search_code":
+        result = search_code(
+            tool_args["query"],
+            mode=tool_args.get("mode", "literal"),
+            path=resolve_path(tool_args.get("path", "."), cwd),
+            glob=tool_args.get("glob"),
+            case_sensitive=tool_args.get("case_sensitive", False),
+            context=tool_args.get("context", 1),
+            max_results=tool_args.get("max_results")
+        )
+    elif tool_name == "tavily_search":
+        if tool_args.get("queries"):
+            result = tavily_search(queries=tool_args["queries"])
+        else:
+            result = tavily_search(tool_args["query"])
+    else:
+        result = f"Unknown tool: {tool_name}"
+    return result
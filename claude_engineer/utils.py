@@ -1,15 +1,13 @@
 import os
-import base64
-from PIL import Image
-import io
-from colorama import Fore, Style
-from pygments import highlight
-from pygments.lexers import get_lexer_by_name
-from pygments.formatters import TerminalFormatter
-import pygments.util
-from bs4 import BeautifulSoup
-import PyPDF2
-from tavily import TavilyClient
+from colorama import Fore
+from .line_index import get_line_index, read_byte_range, decode
+from .pdf_text import read_pdf
+from .html_text import extract_file_text, looks_like_html
+from . import web_search
+from .images import encode_image
+from . import file_index, code_search, terminal
+from .file_edit import edit_file as apply_file_edit, EditError
+from .file_batch import write_batch, BatchError
 
 # Color constants
 USER_COLOR = Fore.WHITE
@@ -18,24 +16,26 @@ TOOL_COLOR = Fore.YELLOW
 RESULT_COLOR = Fore.GREEN
 ERROR_COLOR = Fore.RED 
 
-def print_colored(text, color):
-    print(f"{color}{text}{Style.RESET_ALL}")
+# Files larger than this are returned one page at a time unless a range is requested
+READ_FILE_MAX_BYTES = 100_000
+READ_PAGE_LINES = 500
+HTML_EXTENSIONS = ['.html', '.htm', '.xhtml']
 
 def print_colored(text, color):
-    print(f"{color}{text}{Style.RESET_ALL}")
+    terminal.print_colored(text, color)
 
-def print_code(code, language):
-    try:
-        lexer = get_lexer_by_name(language, stripall=True)
-        formatted_code = highlight(code, lexer, TerminalFormatter())
-        print(formatted_code)
-    except pygments.util.ClassNotFound:
-        # If the language is not recognized, fall back to plain text
-        print_colored(f"Code (language: {language}):\n{code}", CLAUDE_COLOR)
+def print_code(code, language, pager=False):
+    terminal.print_code(code, language, CLAUDE_COLOR, pager=pager)
+
+def notify_changed(path):
+    # Keep the file tree and code search indexes in step with files the tools write
+    file_index.notify_changed(path)
+    code_search.notify_changed(path)
 
 def create_folder(path):
     try:
         os.makedirs(path, exist_ok=True)
+        notify_changed(path)
         return f"Folder created: {path}"
     except Exception as e:
         return f"Error creating folder: {str(e)}"
@@ -44,6 +44,7 @@ def create_file(path, content=""):
     try:
         with open(path, 'w') as f:
             f.write(content)
+        notify_changed(path)
         return f"File created: {path}"
     except Exception as e:
         return f"Error creating file: {str(e)}"
@@ -52,86 +53,137 @@ def write_to_file(path, content):
     try:
         with open(path, 'w') as f:
             f.write(content)
+        notify_changed(path)
         return f"Content written to file: {path}"
     except Exception as e:
         return f"Error writing to file: {str(e)}"
 
-def read_file(path):
-    def is_html(content, file_extension):
-        html_extensions = ['.html', '.htm', '.xhtml']
-        return (file_extension.lower() in html_extensions or
-                content.strip().startswith('<!DOCTYPE html>') or
-                content.strip().startswith('<html'))
-
-    def read_pdf(pdf_path):
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+def write_files(folders=None, files=None):
+    try:
+        result = write_batch(folders, files)
+        for path in result.created_dirs + result.written:
+            notify_changed(path)
+        return result.summary()
+    except BatchError as e:
+        return f"Error writing files (nothing was written): {str(e)}"
+    except Exception as e:
+        return f"Error writing files (all changes were rolled back): {str(e)}"
+
+def edit_file(path, edits=None, diff=None):
+    try:
+        result = apply_file_edit(path, edits=edits, diff=diff)
+        notify_changed(path)
+        return result
+    except EditError as e:
+        return f"Error editing file (nothing was written): {str(e)}"
+    except Exception as e:
+        return f"Error editing file: {str(e)}"
+
+def _format_size(size):
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
 
+def read_file_range(path, start_line=None, end_line=None, head=None, tail=None,
+                    page=None, page_size=None, byte_offset=None, byte_count=None):
+    try:
+        if byte_offset is not None or byte_count is not None:
+            size = os.path.getsize(path)
+            start = min(max(int(byte_offset or 0), 0), size)
+            end = size if byte_count is None else min(start + max(int(byte_count), 0), size)
+            data = read_byte_range(path, start, end)
+            header = f"[File: {path} | {_format_size(size)} | showing bytes {start}-{end} of {size}]"
+            return f"{header}\n{data.decode('utf-8', errors='replace')}"
+
+        index = get_line_index(path)
+        total = index.line_count
+        page_size = max(int(page_size or READ_PAGE_LINES), 1)
+        pages = max((total + page_size - 1) // page_size, 1)
+        page_info = ""
+        if head is not None:
+            first, last = 1, int(head)
+        elif tail is not None:
+            first, last = total - int(tail) + 1, total
+        elif start_line is not None or end_line is not None:
+            first = int(start_line or 1)
+            last = int(end_line) if end_line is not None else first + page_size - 1
+        else:
+            page = min(max(int(page or 1), 1), pages)
+            first = (page - 1) * page_size + 1
+            last = page * page_size
+            page_info = f" (page {page} of {pages}, {page_size} lines per page)"
+        first = max(first, 1)
+        last = min(last, total)
+
+        header = f"[File: {path} | {total} lines | {_format_size(index.size)}"
+        if first > last:
+            return f"{header} | requested range is past the end of the file]"
+        start, end = index.byte_range(first, last)
+        text = decode(read_byte_range(path, start, end))
+        header += f" | showing lines {first}-{last}{page_info}]"
+        if last < total:
+            if not text.endswith("\n"):
+                text += "\n"
+            text += f"[... {total - last} more lines. Request another range or page to continue.]"
+        return f"{header}\n{text}"
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+def read_file(path, start_line=None, end_line=None, head=None, tail=None,
+              page=None, page_size=None, byte_offset=None, byte_count=None,
+              start_page=None, end_page=None):
+    ranged = any(arg is not None for arg in (start_line, end_line, head, tail, page, page_size, byte_offset, byte_count))
     try:
         file_name, file_extension = os.path.splitext(path)
         
         if file_extension.lower() == '.pdf':
-            pdf_content = read_pdf(path)
-            return f"PDF content detected. Extracted text:\n\n{pdf_content}"
+            return read_pdf(path, start_page, end_page)
 
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        if is_html(content, file_extension):
-            soup = BeautifulSoup(content, 'html.parser')
-            text_content = soup.get_text(separator='\n', strip=True)
+        # Large files and explicit ranges are served a slice at a time instead of whole
+        if ranged or (os.path.getsize(path) > READ_FILE_MAX_BYTES and file_extension.lower() not in HTML_EXTENSIONS):
+            return read_file_range(path, start_line, end_line, head, tail, page, page_size, byte_offset, byte_count)
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        if looks_like_html(raw, file_extension, HTML_EXTENSIONS):
+            text_content = extract_file_text(path, raw)
             return f"HTML content detected. Extracted text:\n\n{text_content}"
-        
-        return content
-    except UnicodeDecodeError:
-        try:
-            # If UTF-8 fails, try with ISO-8859-1 encoding
-            with open(path, 'r', encoding='iso-8859-1') as f:
-                content = f.read()
-            
-            if is_html(content, file_extension):
-                soup = BeautifulSoup(content, 'html.parser')
-                text_content = soup.get_text(separator='\n', strip=True)
-                return f"HTML content detected. Extracted text:\n\n{text_content}"
-            
-            return content
-        except Exception as e:
-            return f"Error reading file: {str(e)}"
+
+        # Decode in memory (UTF-8, falling back to ISO-8859-1) with universal newlines
+        content = decode(raw)
+        return content.replace('\r\n', '\n').replace('\r', '\n')
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
-def list_files(path="."):
+def list_files(path=".", depth=None, patterns=None, include_ignored=False):
     try:
-        files = os.listdir(path)
-        return "\n".join(files)
+        return file_index.list_tree(path, depth=depth, patterns=patterns, include_ignored=include_ignored)
     except Exception as e:
         return f"Error listing files: {str(e)}"
 
+def search_code(query, mode="literal", path=".", glob=None, case_sensitive=False, context=1, max_results=None):
+    try:
+        return code_search.search_code(
+            query, mode=mode, path=path, glob=glob, case_sensitive=case_sensitive, context=context,
+            max_results=max_results or code_search.DEFAULT_MAX_RESULTS
+        )
+    except Exception as e:
+        return f"Error searching code: {str(e)}"
+
 def encode_image_to_base64(image_path):
     try:
-        with Image.open(image_path) as img:
-            # Resize image if it's too large
-            max_size = (1024, 1024)
-            img.thumbnail(max_size, Image.DEFAULT_STRATEGY)
-
-            # Convert image to RGB if it's not
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='JPEG')
-            return base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
+        _, data = encode_image(image_path)
+        return data
     except Exception as e:
         return f"Error encoding image: {str(e)}"
     
-def tavily_search(query):
+def tavily_search(query=None, queries=None):
     try:
-        # Initialize the Tavily client
-        tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-        response = tavily.qna_search(query=query, search_depth="advanced")
-        return response
+        if queries:
+            answers = web_search.search_many(queries)
+            return "\n\n".join(f"Query: {q}\n{answer}" for q, answer in zip(queries, answers))
+        return web_search.search(query)
     except Exception as e:
-        return f"Error performing search: {str(e)}"
\ No newline at end of file
+        return f"Error performing search: {str(e)}"
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .cache import DiskCache
+
+SEARCH_TTL = int(os.getenv("CLAUDE_ENGINEER_SEARCH_TTL", str(24 * 3600)))
+SEARCH_CACHE_ENTRIES = 1000
+MAX_SEARCH_WORKERS = 4
+
+
+class TavilyBackend:
+    name = "tavily"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from tavily import TavilyClient
+                self._client = TavilyClient(api_key=self.api_key or os.getenv("TAVILY_API_KEY"))
+            return self._client
+
+    def search(self, query):
+        return self._get_client().qna_search(query=query, search_depth="advanced")
+
+
+class StubBackend:
+    """Offline backend answering from a dict or JSON file of canned results."""
+
+    name = "stub"
+
+    def __init__(self, responses=None):
+        if isinstance(responses, str):
+            with open(responses) as f:
+                responses = json.load(f)
+        self.responses = {normalize_query(query): answer for query, answer in (responses or {}).items()}
+        self.calls = []
+
+    def search(self, query):
+        self.calls.append(query)
+        return self.responses.get(normalize_query(query), f"No stub result for: {query}")
+
+
+_backend = None
+_cache = None
+_backend_lock = threading.Lock()
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def set_backend(backend, cache=None):
+    global _backend, _cache
+    with _backend_lock:
+        _backend = backend
+        _cache = cache
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            stub_file = os.getenv("CLAUDE_ENGINEER_SEARCH_STUB")
+            _backend = StubBackend(stub_file) if stub_file else TavilyBackend()
+        return _backend
+
+
+def get_cache():
+    global _cache
+    with _backend_lock:
+        if _cache is None:
+            _cache = DiskCache("web_search", ttl=SEARCH_TTL, max_entries=SEARCH_CACHE_ENTRIES)
+        return _cache
+
+
+def search(query):
+    backend = get_backend()
+    cache = get_cache()
+    key = f"{backend.name}:{normalize_query(query)}"
+    cached = cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    result = backend.search(query)
+    cache.set(key, json.dumps(result))
+    return result
+
+
+def search_many(queries):
+    # Duplicate queries (after normalization) are only searched once
+    unique = {}
+    for query in queries:
+        unique.setdefault(normalize_query(query), query)
+
+    def run(query):
+        try:
+            return search(query)
+        except Exception as e:
+            return f"Error performing search: {str(e)}"
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_SEARCH_WORKERS, len(unique)))) as pool:
+        answers = dict(zip(unique, pool.map(run, unique.values())))
+    return [answers[normalize_query(query)] for query in queries]
@@ -23,6 +23,9 @@ setup(
         "beautifulsoup4",
         "PyPDF2",
     ],
+    extras_require={
+        "fast": ["lxml"],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from claude_engineer import code_search, file_index
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(code_search, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(code_search, "_indexes", {})
+    monkeypatch.setattr(file_index, "_indexes", file_index.OrderedDict())
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / ".git").mkdir()
+    return root
+
+
+def test_file_rewritten_in_place_is_reindexed(project):
+    source = project / "a.py"
+    source.write_text("def alpha():\n    pass\n")
+    # Old enough that the file index trusts its cached listing of the directory
+    os.utime(project, (1_600_000_000, 1_600_000_000))
+    assert "1 matches" in code_search.search_code("alpha", path=str(project))
+
+    dir_mtime = os.stat(project).st_mtime_ns
+    # Rewrite in place, as most editors do, without going through the tools
+    with open(source, "r+") as f:
+        f.truncate(0)
+        f.write("def gamma():\n    return 1\n")
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert os.stat(project).st_mtime_ns == dir_mtime
+
+    assert "1 matches" in code_search.search_code("gamma", path=str(project))
+    assert "0 matches" in code_search.search_code("alpha", path=str(project))
+    assert "a.py:1:" in code_search.search_code("gamma", mode="symbol", path=str(project))
+
+
+def test_multiline_literal(project):
+    (project / "b.py").write_text("def beta():\n    return 2\n")
+    result = code_search.search_code("def beta():\n    return 2", path=str(project))
+    assert "b.py:1:" in result and "b.py:2:" in result
@@ -0,0 +1,54 @@
+import os
+import sys
+
+from anthropic import AsyncAnthropic
+
+from claude_engineer.cassette import Cassette
+from claude_engineer.session import Session
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from mock_api import MockMessagesAPI  # noqa: E402
+
+
+def truncating_script(calls, path):
+    """Cuts the create_file call off at the default budget; it fits once max_tokens is doubled."""
+    def script(body):
+        calls.append(body["max_tokens"])
+        content = body["messages"][-1]["content"]
+        if isinstance(content, list) and any(block.get("type") == "tool_result" for block in content):
+            return {"text": "Done."}
+        tool_uses = [{"name": "create_file", "input": {"path": path, "content": "complete"}}]
+        if body["max_tokens"] <= 4000:
+            return {"tool_uses": tool_uses, "stop_reason": "max_tokens"}
+        return {"tool_uses": tool_uses}
+    return script
+
+
+def run_chat(tmp_path, cassette):
+    calls = []
+    target = tmp_path / "out.txt"
+    with MockMessagesAPI(truncating_script(calls, str(target))) as api:
+        session = Session(client=AsyncAnthropic(api_key="test", base_url=api.url, max_retries=0),
+                          cwd=str(tmp_path), display=False, routing="quality", cassette=cassette)
+        response, _ = session.chat("Write out.txt")
+    return calls, target, response
+
+
+def test_truncated_tool_call_is_regenerated(tmp_path):
+    calls, target, response = run_chat(tmp_path, None)
+    assert calls == [4000, 8000, 4000]
+    assert target.read_text() == "complete"
+    assert "output limit" not in response
+
+
+def test_truncated_tool_call_is_regenerated_through_cassette(tmp_path):
+    cassette_dir = str(tmp_path / "cassette")
+    calls, target, response = run_chat(tmp_path, Cassette(cassette_dir, "record-missing"))
+    assert calls == [4000, 8000, 4000]
+    assert target.read_text() == "complete"
+    assert "output limit" not in response
+
+    target.unlink()
+    calls, target, response = run_chat(tmp_path, Cassette(cassette_dir, "replay"))
+    assert calls == []
+    assert target.read_text() == "complete"
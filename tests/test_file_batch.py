@@ -0,0 +1,32 @@
+import pytest
+
+from claude_engineer import file_batch
+
+
+def test_folder_sync_failure_keeps_the_batch(tmp_path, monkeypatch):
+    def failing_fsync(path):
+        raise OSError(5, "Input/output error")
+    monkeypatch.setattr(file_batch, "_fsync_dir", failing_fsync)
+
+    result = file_batch.write_batch(files=[{"path": str(tmp_path / "new" / "a.txt"), "content": "kept"}])
+
+    assert (tmp_path / "new" / "a.txt").read_text() == "kept"
+    assert result.warnings
+    assert "Warning: could not sync" in result.summary()
+
+
+def test_failed_rename_rolls_back(tmp_path, monkeypatch):
+    (tmp_path / "old.txt").write_text("original")
+    real_replace = file_batch.os.replace
+
+    def replace(src, dst):
+        if str(dst).endswith("b.txt"):
+            raise OSError(28, "No space left on device")
+        return real_replace(src, dst)
+    monkeypatch.setattr(file_batch.os, "replace", replace)
+
+    with pytest.raises(OSError):
+        file_batch.write_batch(files=[{"path": str(tmp_path / "old.txt"), "content": "new"},
+                                      {"path": str(tmp_path / "b.txt"), "content": "b"}])
+    assert (tmp_path / "old.txt").read_text() == "original"
+    assert not (tmp_path / "b.txt").exists()
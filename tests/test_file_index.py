@@ -0,0 +1,21 @@
+from claude_engineer import file_index
+
+
+def test_walk_without_depth_stops_at_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_index, "_indexes", file_index.OrderedDict())
+    for top in range(3):
+        folder = tmp_path / f"dir{top}"
+        folder.mkdir()
+        for number in range(50):
+            (folder / f"file{number}.txt").write_text("x")
+
+    listing = file_index.list_tree(str(tmp_path), max_tokens=10)
+    header = listing.splitlines()[0]
+    assert "walk stopped after 40 entries" in header
+    assert "at least" in header
+    # Breadth first, so every top-level folder is still listed
+    assert all(f"dir{top}/" in listing for top in range(3))
+
+    full = file_index.list_tree(str(tmp_path))
+    assert "150 files, 3 directories" in full.splitlines()[0]
+    assert "walk stopped" not in full
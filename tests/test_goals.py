@@ -0,0 +1,28 @@
+import os
+import sys
+
+from anthropic import AsyncAnthropic
+
+from claude_engineer.session import Session
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from mock_api import MockMessagesAPI  # noqa: E402
+
+PLAN = "Plan:\nGoal 1: write the backend\nGoal 2: write the frontend\nGoal 3: write the docs\n"
+
+
+def test_parallel_goals_share_the_iteration_budget(tmp_path):
+    def script(body):
+        first = body["messages"][0]["content"]
+        if "Your goal: Goal" in str(first):
+            # A goal that never finishes keeps asking for more iterations
+            return {"text": "Still working on it."}
+        return {"text": PLAN}
+
+    with MockMessagesAPI(script) as api:
+        session = Session(client=AsyncAnthropic(api_key="test", base_url=api.url, max_retries=0),
+                          cwd=str(tmp_path), display=False, routing="quality", parallel_goals=3)
+        _, iterations = session.run_automode("Build the app", 10)
+
+    assert api.request_count == 10
+    assert iterations == 10